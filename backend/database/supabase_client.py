@@ -78,6 +78,16 @@ def with_retry(fn: Callable[[], T]) -> T:
         raise
 
 
+def warm_up_client() -> None:
+    """Open the client's HTTP connection with a trivial query so the first
+    real request doesn't pay the TLS handshake."""
+    try:
+        get_supabase_client().table("users").select("id").limit(1).execute()
+        logger.info("Supabase connection warmed up")
+    except Exception as exc:
+        logger.warning("Supabase warm-up query failed: %s", exc)
+
+
 # Helper functions for querying tables
 
 def get_user_phone_numbers(user_id: str) -> List[Dict[str, Any]]:
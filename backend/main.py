@@ -7,10 +7,12 @@ Or use the Procfile/Dockerfile which set PYTHONPATH automatically.
 """
 
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from backend.routers.app_api import router as app_api_router
 from backend.routers.coaching_router import router as coaching_router
@@ -22,6 +24,7 @@ from backend.routers.todos import router as todos_router
 from backend.routers.recap_router import router as recap_router
 from backend.middleware.rate_limit_middleware import RateLimitMiddleware
 from backend.config import get_settings
+from backend.database.supabase_client import warm_up_client
 from backend.services.scheduler_service import scheduler_service
 
 logger = logging.getLogger(__name__)
@@ -37,8 +40,13 @@ async def lifespan(app: FastAPI):
     scheduler_service.start()
     logger.info("Background scheduler started for task reminders")
 
+    # Warm the Supabase connection in the background; startup doesn't wait on it
+    warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up_client))
+
     yield
 
+    warm_up_task.cancel()
+
     # Shutdown
     logger.info("Shutting down CoreSense Backend...")
     scheduler_service.stop()
@@ -50,7 +58,8 @@ app = FastAPI(
     title="CoreSense Backend API",
     description="Backend API for CoreSense - Personal AI Coach",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # C-level JSON encoding for every endpoint
 )
 
 # Configure CORS (allow app to call backend)
@@ -0,0 +1,40 @@
+-- 037: Single round-trip essential context for coach thread initialization
+-- Replaces the separate users / user_streaks / shared_todos lookups done by
+-- ContextService with one RPC returning a JSON object.
+
+CREATE OR REPLACE FUNCTION public.get_essential_context(p_user_id UUID)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT json_build_object(
+        'name', (SELECT u.name FROM users u WHERE u.id = p_user_id),
+        'current_streak', COALESCE(
+            (SELECT s.current_streak FROM user_streaks s WHERE s.user_id = p_user_id LIMIT 1), 0
+        ),
+        'longest_streak', COALESCE(
+            (SELECT s.longest_streak FROM user_streaks s WHERE s.user_id = p_user_id LIMIT 1), 0
+        ),
+        'pending_todos', COALESCE(
+            (
+                SELECT json_agg(t)
+                FROM (
+                    SELECT title, priority, due_date, created_by, coach_reasoning
+                    FROM shared_todos
+                    WHERE user_id = p_user_id
+                      AND status IN ('pending', 'in_progress')
+                    LIMIT 5
+                ) t
+            ),
+            '[]'::json
+        )
+    );
+$$;
+
+-- Only allow the service_role (backend) to call this function
+REVOKE ALL ON FUNCTION public.get_essential_context(UUID) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.get_essential_context(UUID) FROM anon;
+REVOKE ALL ON FUNCTION public.get_essential_context(UUID) FROM authenticated;
+GRANT EXECUTE ON FUNCTION public.get_essential_context(UUID) TO service_role;
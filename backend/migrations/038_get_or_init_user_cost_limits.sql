@@ -0,0 +1,71 @@
+-- 038: Get-or-create user cost limits in a single round-trip
+-- Inserts the default limits row on first use and resets the daily counters
+-- when last_reset_date is before today, returning the resulting row as JSON.
+-- Replaces the SELECT / reset UPDATE / re-SELECT / INSERT sequence in
+-- services/cost_control.get_user_cost_limits.
+
+-- ON CONFLICT (user_id) needs a unique index. Keep the most recently reset
+-- row for any user that has duplicates before creating it.
+DELETE FROM user_cost_limits a
+USING user_cost_limits b
+WHERE a.user_id = b.user_id
+  AND (
+      COALESCE(a.last_reset_date, '-infinity'::date) < COALESCE(b.last_reset_date, '-infinity'::date)
+      OR (
+          COALESCE(a.last_reset_date, '-infinity'::date) = COALESCE(b.last_reset_date, '-infinity'::date)
+          AND a.ctid < b.ctid
+      )
+  );
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_cost_limits_user
+    ON user_cost_limits(user_id);
+
+CREATE OR REPLACE FUNCTION public.get_or_init_user_cost_limits(
+    p_user_id UUID,
+    p_daily_ai_calls_limit INTEGER,
+    p_monthly_ai_calls_limit INTEGER,
+    p_daily_tokens_limit INTEGER
+)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    result JSON;
+BEGIN
+    INSERT INTO user_cost_limits (
+        user_id,
+        daily_ai_calls_limit,
+        monthly_ai_calls_limit,
+        daily_tokens_limit,
+        last_reset_date
+    )
+    VALUES (
+        p_user_id,
+        p_daily_ai_calls_limit,
+        p_monthly_ai_calls_limit,
+        p_daily_tokens_limit,
+        CURRENT_DATE
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        daily_ai_calls_used = CASE
+            WHEN user_cost_limits.last_reset_date < CURRENT_DATE THEN 0
+            ELSE user_cost_limits.daily_ai_calls_used
+        END,
+        daily_tokens_used = CASE
+            WHEN user_cost_limits.last_reset_date < CURRENT_DATE THEN 0
+            ELSE user_cost_limits.daily_tokens_used
+        END,
+        last_reset_date = GREATEST(COALESCE(user_cost_limits.last_reset_date, CURRENT_DATE), CURRENT_DATE)
+    RETURNING row_to_json(user_cost_limits) INTO result;
+
+    RETURN result;
+END;
+$$;
+
+-- Only allow the service_role (backend) to call this function
+REVOKE ALL ON FUNCTION public.get_or_init_user_cost_limits(UUID, INTEGER, INTEGER, INTEGER) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.get_or_init_user_cost_limits(UUID, INTEGER, INTEGER, INTEGER) FROM anon;
+REVOKE ALL ON FUNCTION public.get_or_init_user_cost_limits(UUID, INTEGER, INTEGER, INTEGER) FROM authenticated;
+GRANT EXECUTE ON FUNCTION public.get_or_init_user_cost_limits(UUID, INTEGER, INTEGER, INTEGER) TO service_role;
@@ -0,0 +1,85 @@
+-- 039: Atomic AI call recording
+-- Logs the call and increments the user's usage counters in one transaction.
+-- The increment happens in SQL, so concurrent calls can no longer lose updates
+-- the way the previous read-modify-write in services/cost_control.py could.
+
+CREATE OR REPLACE FUNCTION public.record_ai_call(
+    p_user_id UUID,
+    p_call_type TEXT,
+    p_tokens_generated INTEGER,
+    p_tokens_input INTEGER,
+    p_success BOOLEAN,
+    p_cached BOOLEAN,
+    p_response_time_ms INTEGER,
+    p_error_message TEXT,
+    p_metadata JSONB,
+    p_model_path TEXT
+)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    result JSON;
+BEGIN
+    INSERT INTO ai_call_logs (
+        user_id,
+        call_type,
+        tokens_generated,
+        tokens_input,
+        model_path,
+        response_time_ms,
+        success,
+        error_message,
+        cached,
+        metadata
+    )
+    VALUES (
+        p_user_id,
+        p_call_type,
+        p_tokens_generated,
+        p_tokens_input,
+        p_model_path,
+        p_response_time_ms,
+        p_success,
+        p_error_message,
+        p_cached,
+        COALESCE(p_metadata, '{}'::jsonb)
+    );
+
+    -- Only successful, uncached calls count against the user's quota
+    IF NOT p_success OR p_cached THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO user_cost_limits (
+        user_id,
+        daily_ai_calls_used,
+        monthly_ai_calls_used,
+        daily_tokens_used,
+        last_reset_date
+    )
+    VALUES (p_user_id, 1, 1, p_tokens_generated, CURRENT_DATE)
+    ON CONFLICT (user_id) DO UPDATE SET
+        daily_ai_calls_used = CASE
+            WHEN user_cost_limits.last_reset_date < CURRENT_DATE THEN 1
+            ELSE user_cost_limits.daily_ai_calls_used + 1
+        END,
+        monthly_ai_calls_used = user_cost_limits.monthly_ai_calls_used + 1,
+        daily_tokens_used = CASE
+            WHEN user_cost_limits.last_reset_date < CURRENT_DATE THEN p_tokens_generated
+            ELSE user_cost_limits.daily_tokens_used + p_tokens_generated
+        END,
+        last_reset_date = GREATEST(COALESCE(user_cost_limits.last_reset_date, CURRENT_DATE), CURRENT_DATE)
+    RETURNING row_to_json(user_cost_limits) INTO result;
+
+    RETURN result;
+END;
+$$;
+
+-- Only allow the service_role (backend) to call this function
+REVOKE ALL ON FUNCTION public.record_ai_call(UUID, TEXT, INTEGER, INTEGER, BOOLEAN, BOOLEAN, INTEGER, TEXT, JSONB, TEXT) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.record_ai_call(UUID, TEXT, INTEGER, INTEGER, BOOLEAN, BOOLEAN, INTEGER, TEXT, JSONB, TEXT) FROM anon;
+REVOKE ALL ON FUNCTION public.record_ai_call(UUID, TEXT, INTEGER, INTEGER, BOOLEAN, BOOLEAN, INTEGER, TEXT, JSONB, TEXT) FROM authenticated;
+GRANT EXECUTE ON FUNCTION public.record_ai_call(UUID, TEXT, INTEGER, INTEGER, BOOLEAN, BOOLEAN, INTEGER, TEXT, JSONB, TEXT) TO service_role;
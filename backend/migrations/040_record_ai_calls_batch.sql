@@ -0,0 +1,93 @@
+-- 040: Batched AI call recording
+-- Accepts a JSON array of buffered calls from services/cost_control.py,
+-- inserts them into ai_call_logs with one statement and applies one
+-- aggregated counter update per user. Under bursty traffic this turns
+-- O(messages) user_cost_limits UPDATEs into O(users) per flush.
+
+CREATE OR REPLACE FUNCTION public.record_ai_calls(p_calls JSONB)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    CREATE TEMP TABLE _pending_ai_calls ON COMMIT DROP AS
+    SELECT *
+    FROM jsonb_to_recordset(p_calls) AS c(
+        user_id UUID,
+        call_type TEXT,
+        tokens_generated INTEGER,
+        tokens_input INTEGER,
+        model_path TEXT,
+        response_time_ms INTEGER,
+        success BOOLEAN,
+        error_message TEXT,
+        cached BOOLEAN,
+        metadata JSONB
+    );
+
+    INSERT INTO ai_call_logs (
+        user_id,
+        call_type,
+        tokens_generated,
+        tokens_input,
+        model_path,
+        response_time_ms,
+        success,
+        error_message,
+        cached,
+        metadata
+    )
+    SELECT
+        user_id,
+        call_type,
+        tokens_generated,
+        tokens_input,
+        model_path,
+        response_time_ms,
+        success,
+        error_message,
+        cached,
+        COALESCE(metadata, '{}'::jsonb)
+    FROM _pending_ai_calls;
+
+    -- Only successful, uncached calls count against the user's quota
+    INSERT INTO user_cost_limits (
+        user_id,
+        daily_ai_calls_used,
+        monthly_ai_calls_used,
+        daily_tokens_used,
+        last_reset_date
+    )
+    SELECT
+        user_id,
+        COUNT(*),
+        COUNT(*),
+        COALESCE(SUM(tokens_generated), 0),
+        CURRENT_DATE
+    FROM _pending_ai_calls
+    WHERE success AND NOT cached
+    GROUP BY user_id
+    ON CONFLICT (user_id) DO UPDATE SET
+        daily_ai_calls_used = CASE
+            WHEN user_cost_limits.last_reset_date < CURRENT_DATE THEN EXCLUDED.daily_ai_calls_used
+            ELSE user_cost_limits.daily_ai_calls_used + EXCLUDED.daily_ai_calls_used
+        END,
+        monthly_ai_calls_used = user_cost_limits.monthly_ai_calls_used + EXCLUDED.monthly_ai_calls_used,
+        daily_tokens_used = CASE
+            WHEN user_cost_limits.last_reset_date < CURRENT_DATE THEN EXCLUDED.daily_tokens_used
+            ELSE user_cost_limits.daily_tokens_used + EXCLUDED.daily_tokens_used
+        END,
+        last_reset_date = GREATEST(COALESCE(user_cost_limits.last_reset_date, CURRENT_DATE), CURRENT_DATE);
+END;
+$$;
+
+-- Only allow the service_role (backend) to call this function
+REVOKE ALL ON FUNCTION public.record_ai_calls(JSONB) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.record_ai_calls(JSONB) FROM anon;
+REVOKE ALL ON FUNCTION public.record_ai_calls(JSONB) FROM authenticated;
+GRANT EXECUTE ON FUNCTION public.record_ai_calls(JSONB) TO service_role;
+
+-- The single-call record_ai_call (039) has no callers now that every call is
+-- buffered and written through record_ai_calls
+DROP FUNCTION IF EXISTS public.record_ai_call(UUID, TEXT, INTEGER, INTEGER, BOOLEAN, BOOLEAN, INTEGER, TEXT, JSONB, TEXT);
@@ -0,0 +1,31 @@
+-- 041: Server-side usage stats for services/cost_control.get_user_usage_stats
+-- Returns the call counts, token total and average latency for a user's
+-- recent AI calls as a single JSON row instead of shipping every log row.
+
+CREATE INDEX IF NOT EXISTS idx_ai_call_logs_user_created
+    ON ai_call_logs(user_id, created_at DESC);
+
+CREATE OR REPLACE FUNCTION public.get_usage_stats_agg(p_user_id UUID, p_days INTEGER)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT json_build_object(
+        'total_calls', COUNT(*),
+        'successful_calls', COUNT(*) FILTER (WHERE COALESCE(success, TRUE)),
+        'cached_calls', COUNT(*) FILTER (WHERE COALESCE(cached, FALSE)),
+        'total_tokens', COALESCE(SUM(tokens_generated), 0),
+        'avg_response_time_ms', COALESCE(AVG(response_time_ms), 0)
+    )
+    FROM ai_call_logs
+    WHERE user_id = p_user_id
+      AND created_at >= NOW() - make_interval(days => p_days);
+$$;
+
+-- Only allow the service_role (backend) to call this function
+REVOKE ALL ON FUNCTION public.get_usage_stats_agg(UUID, INTEGER) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.get_usage_stats_agg(UUID, INTEGER) FROM anon;
+REVOKE ALL ON FUNCTION public.get_usage_stats_agg(UUID, INTEGER) FROM authenticated;
+GRANT EXECUTE ON FUNCTION public.get_usage_stats_agg(UUID, INTEGER) TO service_role;
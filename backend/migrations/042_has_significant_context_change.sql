@@ -0,0 +1,26 @@
+-- 042: Single-query change detection for coach context re-injection
+-- Returns TRUE when the user's streak row or any of their todos changed
+-- since the last context injection. EXISTS stops at the first match, so no
+-- rows are materialized or shipped back to the backend.
+
+CREATE OR REPLACE FUNCTION public.has_significant_context_change(p_user_id UUID, p_since TIMESTAMPTZ)
+RETURNS BOOLEAN
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT EXISTS (
+        SELECT 1 FROM user_streaks
+        WHERE user_id = p_user_id AND updated_at >= p_since
+    ) OR EXISTS (
+        SELECT 1 FROM shared_todos
+        WHERE user_id = p_user_id AND updated_at >= p_since
+    );
+$$;
+
+-- Only allow the service_role (backend) to call this function
+REVOKE ALL ON FUNCTION public.has_significant_context_change(UUID, TIMESTAMPTZ) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.has_significant_context_change(UUID, TIMESTAMPTZ) FROM anon;
+REVOKE ALL ON FUNCTION public.has_significant_context_change(UUID, TIMESTAMPTZ) FROM authenticated;
+GRANT EXECUTE ON FUNCTION public.has_significant_context_change(UUID, TIMESTAMPTZ) TO service_role;
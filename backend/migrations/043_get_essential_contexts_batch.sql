@@ -0,0 +1,20 @@
+-- 043: Batched essential context lookup
+-- Returns {user_id: get_essential_context(user_id)} for every id passed in, so
+-- context requests for several users arriving together cost one round-trip.
+
+CREATE OR REPLACE FUNCTION public.get_essential_contexts(p_user_ids UUID[])
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT COALESCE(json_object_agg(u.id, public.get_essential_context(u.id)), '{}'::json)
+    FROM unnest(p_user_ids) AS u(id);
+$$;
+
+-- Only allow the service_role (backend) to call this function
+REVOKE ALL ON FUNCTION public.get_essential_contexts(UUID[]) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.get_essential_contexts(UUID[]) FROM anon;
+REVOKE ALL ON FUNCTION public.get_essential_contexts(UUID[]) FROM authenticated;
+GRANT EXECUTE ON FUNCTION public.get_essential_contexts(UUID[]) TO service_role;
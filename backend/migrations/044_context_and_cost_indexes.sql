@@ -0,0 +1,21 @@
+-- Migration 044: Indexes for coach context and cost control queries
+-- ai_call_logs(user_id, created_at DESC) already ships with 041.
+
+-- shared_todos: pending todos in get_essential_context
+CREATE INDEX IF NOT EXISTS idx_shared_todos_user_open_created
+  ON shared_todos(user_id, created_at DESC)
+  WHERE status IN ('pending', 'in_progress');
+
+-- shared_todos: change detection in has_significant_context_change
+CREATE INDEX IF NOT EXISTS idx_shared_todos_user_updated
+  ON shared_todos(user_id, updated_at DESC);
+
+-- assistant_threads: active-thread lookups in should_inject_context
+CREATE INDEX IF NOT EXISTS idx_assistant_threads_user_active
+  ON assistant_threads(user_id)
+  WHERE status = 'active';
+
+-- user_cost_limits: ON CONFLICT (user_id) target for the cost RPCs
+-- (first created in 038; kept here for databases that skipped it)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_user_cost_limits_user
+  ON user_cost_limits(user_id);
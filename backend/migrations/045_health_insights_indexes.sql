@@ -0,0 +1,10 @@
+-- Migration 045: Index for the health insights fallback query
+-- health_metrics_daily is a plain view grouped by (user_id, recorded_date), so
+-- it cannot be indexed itself; its user_id / date filter is pushed down to
+-- health_metrics and served by idx_health_metrics_user_recorded_date (019).
+
+-- health_metrics: raw fallback aggregation in the health insights engine
+-- filters by user and recorded_at across all metric types, which the
+-- (user_id, metric_type, recorded_at) indexes cannot range-scan.
+CREATE INDEX IF NOT EXISTS idx_health_metrics_user_recorded_at
+  ON health_metrics(user_id, recorded_at DESC);
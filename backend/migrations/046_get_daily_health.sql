@@ -0,0 +1,40 @@
+-- 046: Daily health rows for services/health_insights_engine in one round-trip
+-- Aggregates the user's raw health_metrics per recorded_date server-side with
+-- the same rules as the health_metrics_daily view, returning only the columns
+-- the insight analyzers read. Like the view it groups over every metric type,
+-- so days that only have other metrics still count towards days_with_data.
+-- Replaces the view query followed by a second raw health_metrics fetch
+-- aggregated in Python when the view is unavailable.
+
+CREATE OR REPLACE FUNCTION public.get_daily_health(p_user_id UUID, p_start_date DATE)
+RETURNS TABLE (
+    date DATE,
+    sleep_duration_hours NUMERIC,
+    sleep_start_hour NUMERIC,
+    sleep_end_hour NUMERIC,
+    steps INTEGER
+)
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    SELECT
+        recorded_date AS date,
+        SUM(CASE WHEN metric_type = 'sleep_duration' THEN value ELSE 0 END) AS sleep_duration_hours,
+        MIN(CASE WHEN metric_type = 'sleep_start' THEN value END) AS sleep_start_hour,
+        MAX(CASE WHEN metric_type = 'sleep_end' THEN value END) AS sleep_end_hour,
+        SUM(CASE WHEN metric_type = 'steps' THEN value ELSE 0 END)::INT AS steps
+    FROM health_metrics
+    WHERE user_id = p_user_id
+      AND recorded_date >= p_start_date
+    GROUP BY recorded_date
+    ORDER BY recorded_date
+    LIMIT 365;
+$$;
+
+-- Only allow the service_role (backend) to call this function
+REVOKE ALL ON FUNCTION public.get_daily_health(UUID, DATE) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.get_daily_health(UUID, DATE) FROM anon;
+REVOKE ALL ON FUNCTION public.get_daily_health(UUID, DATE) FROM authenticated;
+GRANT EXECUTE ON FUNCTION public.get_daily_health(UUID, DATE) TO service_role;
@@ -3,7 +3,7 @@ CoreSense App API Endpoints
 Handles all mobile app data requests with real user data only.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from datetime import datetime, date, timedelta, timezone
 from typing import Optional, List
 from pydantic import BaseModel, field_validator, Field
@@ -12,6 +12,7 @@ import logging
 
 from backend.database.supabase_client import get_supabase_client, with_retry
 from backend.services.user_initialization_service import initialize_new_user
+from backend.services.context_service import context_service
 from backend.middleware.auth_helper import get_current_user_id
 from backend.utils.supabase_utils import extract_supabase_data, get_first_item_or_none
 from backend.utils.exceptions import DatabaseError, NotFoundError, ValidationError
@@ -746,6 +747,9 @@ async def log_metric(request: MetricLogRequest, user_id: str = Depends(get_curre
             'logged_at': datetime.now(timezone.utc).isoformat()
         }).execute()
 
+        from backend.services.health_insights_engine import health_insights_engine
+        health_insights_engine.invalidate(user_id)
+
         if result.data:
             return {
                 "success": True,
@@ -790,6 +794,9 @@ async def log_batch_metrics(request: MetricBatchRequest, user_id: str = Depends(
 
         result = supabase.table('user_metrics').insert(insert_data).execute()
 
+        from backend.services.health_insights_engine import health_insights_engine
+        health_insights_engine.invalidate(user_id)
+
         return {
             "success": True,
             "metrics": result.data if result.data else [],
@@ -852,8 +859,11 @@ async def get_health_insights(user_id: str = Depends(get_current_user_id)):
     try:
         from backend.services.health_insights_engine import health_insights_engine
 
-        result = await health_insights_engine.get_active_insights(user_id)
-        return result
+        # Served pre-encoded from the engine's cache
+        return Response(
+            content=await health_insights_engine.get_active_insights_json(user_id),
+            media_type="application/json",
+        )
 
     except Exception as e:
         logger.error(f"Error fetching health insights: {e}")
@@ -1241,6 +1251,9 @@ async def sync_health_data(
             payload, on_conflict="user_id,metric_type,recorded_at"
         ).execute()
 
+        from backend.services.health_insights_engine import health_insights_engine
+        health_insights_engine.invalidate(user_id)
+
         # Daily aggregation now happens via health_metrics_daily database view
         # No need to maintain separate user_health_data table
 
@@ -1355,6 +1368,7 @@ async def record_streak(
             )
             
             if result.data:
+                context_service.invalidate(user_id)
                 return {
                     "success": True,
                     "currentStreak": result.data.get('current_streak', 0),
@@ -1398,6 +1412,7 @@ async def record_streak(
                     'last_activity_date': today.isoformat(),
                     'user_timezone': request.timezone
                 }).eq('user_id', user_id).execute()
+                context_service.invalidate(user_id)
                 
                 return {
                     "success": True,
@@ -1412,6 +1427,7 @@ async def record_streak(
                     'last_activity_date': today.isoformat(),
                     'user_timezone': request.timezone
                 }).eq('user_id', user_id).execute()
+                context_service.invalidate(user_id)
                 
                 return {
                     "success": True,
@@ -1428,6 +1444,7 @@ async def record_streak(
                 'last_activity_date': today.isoformat(),
                 'user_timezone': request.timezone
             }).execute()
+            context_service.invalidate(user_id)
             
             return {
                 "success": True,
@@ -1523,6 +1540,7 @@ async def did_it(
                     'last_activity_date': today,
                     'user_timezone': request.timezone
                 }).eq('user_id', user_id).execute()
+                context_service.invalidate(user_id)
                 
                 return {
                     "success": True,
@@ -1537,6 +1555,7 @@ async def did_it(
                     'last_activity_date': today,
                     'user_timezone': request.timezone
                 }).eq('user_id', user_id).execute()
+                context_service.invalidate(user_id)
                 
                 return {
                     "success": True,
@@ -1552,6 +1571,7 @@ async def did_it(
                 'last_activity_date': today,
                 'user_timezone': request.timezone
             }).execute()
+            context_service.invalidate(user_id)
             
             return {
                 "success": True,
@@ -1791,6 +1811,8 @@ async def complete_onboarding(
                     starter_habits.append(resp.data[0])
             except Exception as task_err:
                 logger.warning(f"Failed to create starter recurring task: {task_err}")
+        if starter_habits:
+            context_service.invalidate(user_id)
 
         return {
             "coach_message": coach_message,
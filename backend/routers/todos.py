@@ -14,6 +14,7 @@ from backend.database.supabase_client import get_supabase_client
 from backend.middleware.auth_helper import get_current_user_id
 from backend.utils.exceptions import DatabaseError, NotFoundError, ValidationError
 from backend.services.notification_service import notification_service
+from backend.services.context_service import context_service
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1", tags=["todos"])
@@ -193,6 +194,7 @@ async def create_todo(request: CreateTodoRequest, user_id: str = Depends(get_cur
 
         if response.data and len(response.data) > 0:
             created_todo = response.data[0]
+            context_service.invalidate(user_id)
 
             # Schedule reminder if enabled and has due date
             if request.reminder_enabled and request.due_date:
@@ -249,6 +251,7 @@ async def create_coach_todo(request: CreateCoachTodoRequest, user_id: str = Depe
 
         if response.data and len(response.data) > 0:
             created_todo = response.data[0]
+            context_service.invalidate(user_id)
 
             # Send push notification to user about the new coach task
             try:
@@ -318,6 +321,7 @@ async def update_todo_status(
         )
 
         if response.data and len(response.data) > 0:
+            context_service.invalidate(user_id)
             return response.data[0]
 
         raise NotFoundError("Todo not found")
@@ -373,6 +377,7 @@ async def update_todo(
 
         if response.data and len(response.data) > 0:
             updated_todo = response.data[0]
+            context_service.invalidate(user_id)
 
             # Re-schedule reminders if reminder settings changed
             if request.reminder_enabled is not None or request.due_date is not None or request.due_time is not None:
@@ -414,6 +419,7 @@ async def delete_todo(todo_id: str, user_id: str = Depends(get_current_user_id))
         )
 
         if response.data and len(response.data) > 0:
+            context_service.invalidate(user_id)
             return {"success": True, "message": "Todo cancelled"}
 
         raise NotFoundError("Todo not found")
@@ -3,18 +3,47 @@ Context Service - Extracted from context_injector
 Minimal context injection for Assistant-Native architecture
 """
 
+import asyncio
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Set
 from dataclasses import dataclass
 import json
 
+from cachetools import TTLCache
+
 from backend.database.supabase_client import get_supabase_client
 
 logger = logging.getLogger(__name__)
 
+# Name, streaks and todos change on the order of minutes, so a short TTL
+# absorbs repeated per-message fetches. Entries older than half the TTL are
+# served stale while a background refresh runs.
+CONTEXT_CACHE_TTL_SECONDS = 30
+CONTEXT_CACHE_MAX_SIZE = 10_000
+
+# A "no injection needed" decision stays valid for a minute on hot chats
+INJECTION_CHECK_TTL_SECONDS = 60
+
+# Snapshot requests queued in the same event-loop tick are fetched together
+CONTEXT_BATCH_MAX_SIZE = 100
+
+_CONTEXT_TEMPLATE = """USER CONTEXT UPDATE:
+
+Name: {name}
+Current Streak: {current_streak} days
+Longest Streak: {longest_streak} days
+{habit_stats}
+Pending Tasks (nudge them about these):
+{todos_text}
+
+Context Type: {context_type}"""
+
+_TODO_LINE = "  - {title} [{priority}]{due_info} ({creator})"
+
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TodoItem:
     """Todo item for context"""
     title: str
@@ -24,7 +53,7 @@ class TodoItem:
     coach_reasoning: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class EssentialContext:
     """Minimal context needed for thread initialization"""
     user_name: str
@@ -46,6 +75,20 @@ class ContextService:
     - No expensive comprehensive context fetching
     """
     
+    def __init__(self):
+        # (user_id, context_type) -> (fetched_at, EssentialContext)
+        self._cache: TTLCache = TTLCache(maxsize=CONTEXT_CACHE_MAX_SIZE, ttl=CONTEXT_CACHE_TTL_SECONDS)
+        # (user_id, context_type) -> fetch task shared by concurrent callers
+        self._inflight: Dict[tuple[str, str], asyncio.Task] = {}
+        # user_id -> invalidation count, so a fetch that overlapped an invalidate isn't cached
+        self._generation: TTLCache = TTLCache(maxsize=CONTEXT_CACHE_MAX_SIZE, ttl=CONTEXT_CACHE_TTL_SECONDS)
+        # Pending snapshot requests waiting for the next batched RPC
+        self._snapshot_queue: List[tuple[str, asyncio.Future]] = []
+        # Snapshot batches still in flight (held so they aren't garbage collected)
+        self._batch_tasks: Set[asyncio.Task] = set()
+        # user_ids whose last should_inject_context check returned False
+        self._skip_injection: TTLCache = TTLCache(maxsize=CONTEXT_CACHE_MAX_SIZE, ttl=INJECTION_CHECK_TTL_SECONDS)
+
     @property
     def supabase(self):
         """Get the current Supabase client (always fresh after a reset)."""
@@ -53,6 +96,48 @@ class ContextService:
 
     async def get_essential_context(self, user_id: str, context_type: str = "minimal") -> EssentialContext:
         """Get essential context only - this replaces get_comprehensive_context()"""
+        key = (user_id, context_type)
+        cached = self._cache.get(key)
+        if cached is not None:
+            fetched_at, context = cached
+            if time.monotonic() - fetched_at > CONTEXT_CACHE_TTL_SECONDS / 2:
+                # Serve stale, refresh in the background
+                self._load_context(user_id, context_type)
+            return context
+
+        # Shielded so one caller's cancellation doesn't cancel the shared fetch
+        return await asyncio.shield(self._load_context(user_id, context_type))
+
+    def invalidate(self, user_id: str):
+        """Drop cached context for a user after their todos or streaks change"""
+        self._generation[user_id] = self._generation.get(user_id, 0) + 1
+        for key in [k for k in list(self._cache.keys()) if k[0] == user_id]:
+            self._cache.pop(key, None)
+        # Fetches already running may have read the old data; later callers start fresh
+        for key in [k for k in self._inflight if k[0] == user_id]:
+            del self._inflight[key]
+        self._skip_injection.pop(user_id, None)
+
+    def _load_context(self, user_id: str, context_type: str) -> asyncio.Task:
+        """Start (or join) the fetch for a user's context so concurrent callers share one query"""
+        key = (user_id, context_type)
+        task = self._inflight.get(key)
+        if task is None:
+            generation = self._generation.get(user_id, 0)
+            task = asyncio.create_task(self._fetch_and_cache(user_id, context_type, generation))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key) if self._inflight.get(key) is t else None)
+        return task
+
+    async def _fetch_and_cache(self, user_id: str, context_type: str, generation: int) -> EssentialContext:
+        """Fetch context and cache it unless it fell back to defaults or was invalidated meanwhile"""
+        context = await self._fetch_essential_context(user_id, context_type)
+        if context.context_type != "fallback" and self._generation.get(user_id, 0) == generation:
+            self._cache[(user_id, context_type)] = (time.monotonic(), context)
+        return context
+
+    async def _fetch_essential_context(self, user_id: str, context_type: str) -> EssentialContext:
+        """Fetch essential context from the database"""
         try:
             if context_type == "initialization":
                 return await self._get_initialization_context(user_id)
@@ -67,6 +152,9 @@ class ContextService:
     
     async def should_inject_context(self, user_id: str) -> bool:
         """Determine if context should be injected (e.g., thread creation or significant changes)"""
+        if user_id in self._skip_injection:
+            return False
+
         try:
             # Check if thread exists
             thread_response = self.supabase.table("assistant_threads").select(
@@ -86,7 +174,11 @@ class ContextService:
                 return True
             
             # Check if user data has changed significantly
-            return await self._has_significant_data_change(user_id, last_injection)
+            if await self._has_significant_data_change(user_id, last_injection):
+                return True
+
+            self._skip_injection[user_id] = True
+            return False
             
         except Exception as e:
             logger.error(f"Error checking context injection need: {e}")
@@ -95,7 +187,7 @@ class ContextService:
     async def inject_context_to_thread(self, user_id: str, thread_id: str):
         """Inject context to existing thread"""
         try:
-            if not self.should_inject_context(user_id):
+            if not await self.should_inject_context(user_id):
                 return
             
             # Get essential context
@@ -118,43 +210,30 @@ class ContextService:
     
     def format_for_assistant(self, context: EssentialContext) -> str:
         """Format context as message for Assistant"""
-        # Format todos for the assistant
-        if context.pending_todos:
-            todos_lines = []
-            for todo in context.pending_todos:
-                due_info = f" (due: {todo.due_date})" if todo.due_date else ""
-                creator = "coach-assigned" if todo.created_by == "coach" else "self-set"
-                todos_lines.append(f"  - {todo.title} [{todo.priority}]{due_info} ({creator})")
-            todos_text = "\n".join(todos_lines)
-        else:
-            todos_text = "  None"
-
-        # Fetch habit stats
-        habit_stats = self._get_today_habit_stats_sync(context.user_id)
-
-        return f"""USER CONTEXT UPDATE:
-
-Name: {context.user_name}
-Current Streak: {context.current_streak} days
-Longest Streak: {context.longest_streak} days
-{habit_stats}
-Pending Tasks (nudge them about these):
-{todos_text}
+        todos_text = "\n".join(
+            _TODO_LINE.format(
+                title=todo.title,
+                priority=todo.priority,
+                due_info=f" (due: {todo.due_date})" if todo.due_date else "",
+                creator="coach-assigned" if todo.created_by == "coach" else "self-set",
+            )
+            for todo in context.pending_todos
+        ) or "  None"
 
-Context Type: {context.context_type}"""
+        return _CONTEXT_TEMPLATE.format(
+            name=context.user_name,
+            current_streak=context.current_streak,
+            longest_streak=context.longest_streak,
+            habit_stats=self._get_today_habit_stats_sync(context.user_id),
+            todos_text=todos_text,
+            context_type=context.context_type,
+        )
     
     # Private helper methods
     
     async def _get_initialization_context(self, user_id: str) -> EssentialContext:
         """Get comprehensive context for thread initialization"""
-        # Get user name
-        user_name = await self._get_user_name(user_id)
-
-        # Get streak data
-        current_streak, longest_streak = await self._get_streak_data(user_id)
-
-        # Get pending todos - tasks the coach can reference and nudge about
-        pending_todos = await self._get_pending_todos(user_id)
+        user_name, current_streak, longest_streak, pending_todos = await self._get_context_snapshot(user_id)
 
         return EssentialContext(
             user_name=user_name,
@@ -172,9 +251,7 @@ Context Type: {context.context_type}"""
     
     async def _get_minimal_context(self, user_id: str) -> EssentialContext:
         """Get minimal context - just essentials"""
-        user_name = await self._get_user_name(user_id)
-        current_streak, _ = await self._get_streak_data(user_id)
-        pending_todos = await self._get_pending_todos(user_id)
+        user_name, current_streak, _, pending_todos = await self._get_context_snapshot(user_id)
 
         return EssentialContext(
             user_name=user_name,
@@ -185,10 +262,66 @@ Context Type: {context.context_type}"""
             context_type="minimal"
         )
     
+    async def _get_context_snapshot(self, user_id: str) -> tuple[str, int, int, List[TodoItem]]:
+        """Get name, streaks and pending todos in one round-trip via the batched context RPC"""
+        try:
+            data = await self._queue_snapshot(user_id)
+            return (
+                data.get("name") or "User",
+                data.get("current_streak") or 0,
+                data.get("longest_streak") or 0,
+                [self._todo_from_row(t) for t in data.get("pending_todos") or []],
+            )
+        except Exception as e:
+            logger.error(f"Error getting context snapshot, falling back to per-field queries: {e}")
+
+        # The fallback reads are independent, so overlap their network waits
+        user_name, (current_streak, longest_streak), pending_todos = await asyncio.gather(
+            self._get_user_name(user_id),
+            self._get_streak_data(user_id),
+            self._get_pending_todos(user_id),
+        )
+        return user_name, current_streak, longest_streak, pending_todos
+
+    async def _queue_snapshot(self, user_id: str) -> Dict[str, Any]:
+        """Queue a snapshot request; all requests made in the same loop tick share one RPC"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._snapshot_queue.append((user_id, future))
+        if len(self._snapshot_queue) == 1:
+            loop.call_soon(self._flush_snapshot_queue)
+        return await future
+
+    def _flush_snapshot_queue(self):
+        """Send queued snapshot requests in batches of CONTEXT_BATCH_MAX_SIZE"""
+        queue, self._snapshot_queue = self._snapshot_queue, []
+        for i in range(0, len(queue), CONTEXT_BATCH_MAX_SIZE):
+            task = asyncio.create_task(self._fetch_snapshot_batch(queue[i:i + CONTEXT_BATCH_MAX_SIZE]))
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _fetch_snapshot_batch(self, batch: List[tuple[str, asyncio.Future]]):
+        """Fetch snapshots for a batch of users and resolve each caller's future"""
+        user_ids = list(dict.fromkeys(user_id for user_id, _ in batch))
+        try:
+            response = await asyncio.to_thread(
+                self.supabase.rpc("get_essential_contexts", {"p_user_ids": user_ids}).execute
+            )
+            by_user = response.data or {}
+            for user_id, future in batch:
+                if not future.done():
+                    future.set_result(by_user.get(user_id) or {})
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
     async def _get_user_name(self, user_id: str) -> str:
         """Get user's name"""
         try:
-            response = self.supabase.table("users").select("name").eq("id", user_id).execute()
+            response = await asyncio.to_thread(
+                self.supabase.table("users").select("name").eq("id", user_id).execute
+            )
             if response.data:
                 return response.data[0].get("name", "User")
             return "User"
@@ -206,9 +339,11 @@ Context Type: {context.context_type}"""
     async def _get_streak_data(self, user_id: str) -> tuple[int, int]:
         """Get current and longest streak"""
         try:
-            response = self.supabase.table("user_streaks").select(
-                "current_streak, longest_streak"
-            ).eq("user_id", user_id).execute()
+            response = await asyncio.to_thread(
+                self.supabase.table("user_streaks").select(
+                    "current_streak, longest_streak"
+                ).eq("user_id", user_id).execute
+            )
             
             if response.data:
                 return (
@@ -223,38 +358,41 @@ Context Type: {context.context_type}"""
     async def _get_pending_todos(self, user_id: str) -> List[TodoItem]:
         """Get pending todos for user - these are tasks the coach can nudge about"""
         try:
-            response = self.supabase.table("shared_todos").select(
-                "title, priority, due_date, created_by, coach_reasoning"
-            ).eq("user_id", user_id).in_("status", ["pending", "in_progress"]).limit(5).execute()
+            response = await asyncio.to_thread(
+                self.supabase.table("shared_todos").select(
+                    "title, priority, due_date, created_by, coach_reasoning"
+                ).eq("user_id", user_id).in_("status", ["pending", "in_progress"]).limit(5).execute
+            )
 
             if response.data:
-                return [
-                    TodoItem(
-                        title=t["title"],
-                        priority=t.get("priority", "medium"),
-                        due_date=t.get("due_date"),
-                        created_by=t.get("created_by", "user"),
-                        coach_reasoning=t.get("coach_reasoning")
-                    )
-                    for t in response.data
-                ]
+                return [self._todo_from_row(t) for t in response.data]
             return []
         except Exception as e:
             logger.error(f"Error getting pending todos: {e}")
             return []
     
+    @staticmethod
+    def _todo_from_row(row: Dict[str, Any]) -> TodoItem:
+        """Build a TodoItem from a shared_todos row"""
+        return TodoItem(
+            title=row["title"],
+            priority=row.get("priority") or "medium",
+            due_date=row.get("due_date"),
+            created_by=row.get("created_by") or "user",
+            coach_reasoning=row.get("coach_reasoning")
+        )
+
     async def _has_significant_data_change(self, user_id: str, last_injection: str) -> bool:
         """Check if user data has changed significantly since last context injection"""
         try:
-            # Check for streak changes
-            streak_response = self.supabase.table("user_streaks").select(
-                "updated_at"
-            ).eq("user_id", user_id).gte("updated_at", last_injection).execute()
-
-            if streak_response.data:
-                return True
-
-            return False
+            # Streak or todo changes, checked server-side with EXISTS
+            response = await asyncio.to_thread(
+                self.supabase.rpc("has_significant_context_change", {
+                    "p_user_id": user_id,
+                    "p_since": last_injection
+                }).execute
+            )
+            return bool(response.data)
             
         except Exception as e:
             logger.error(f"Error checking data changes: {e}")
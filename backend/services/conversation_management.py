@@ -20,6 +20,7 @@ import groq
 from groq import Groq
 
 from backend.database.supabase_client import get_supabase_client
+from backend.services.context_service import context_service
 
 logger = logging.getLogger(__name__)
 
@@ -558,6 +559,7 @@ class ConversationManagementService:
 
             if response.data and len(response.data) > 0:
                 created = response.data[0]
+                context_service.invalidate(user_id)
                 logger.info(f"Created coach task '{title}' for user {user_id}")
                 return {
                     "success": True,
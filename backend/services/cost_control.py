@@ -3,10 +3,14 @@ Cost control service.
 Tracks AI calls, enforces limits, and manages usage quotas.
 """
 
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta, timezone, date
+from collections import defaultdict
+import atexit
 import logging
-import hashlib
+import threading
+
+from cachetools import TTLCache
 
 from backend.database.supabase_client import get_supabase_client
 
@@ -22,6 +26,26 @@ MAX_TOKENS_PER_CALL = 200  # Maximum tokens per AI generation
 MAX_MESSAGE_LENGTH = 1000  # Maximum message length in characters
 MIN_TIME_BETWEEN_CALLS = 1  # Minimum seconds between AI calls for same user
 
+AI_MODEL_PATH = "mlx-community/Llama-3.2-3B-Instruct"
+
+# Buffered call recording: calls are flushed to Postgres in one batch every
+# few seconds so bursts from a single user don't hammer their limits row
+USAGE_FLUSH_INTERVAL_SECONDS = 3
+AI_CALL_BATCH_SIZE = 200  # Flush early once this many calls are buffered
+AI_CALL_BUFFER_MAX_SIZE = 10_000  # Drop (and warn) beyond this if flushes are failing
+
+_pending_calls: List[Dict[str, Any]] = []
+_pending_usage: Dict[str, Dict[str, int]] = defaultdict(lambda: {"calls": 0, "tokens": 0})
+_pending_lock = threading.Lock()
+_flush_timer: Optional[threading.Timer] = None
+
+# Limits rows are re-read on every inbound message; a short TTL absorbs bursts
+# from the same user. Pending deltas above keep the counters accurate.
+LIMITS_CACHE_TTL_SECONDS = 2
+
+_limits_cache: TTLCache = TTLCache(maxsize=50_000, ttl=LIMITS_CACHE_TTL_SECONDS)
+_limits_cache_lock = threading.Lock()
+
 
 def get_user_cost_limits(user_id: str) -> Dict[str, Any]:
     """
@@ -33,48 +57,28 @@ def get_user_cost_limits(user_id: str) -> Dict[str, Any]:
     Returns:
         Dict with cost limit information
     """
-    client = get_supabase_client()
+    with _limits_cache_lock:
+        cached = _limits_cache.get(user_id)
+    if cached is not None:
+        return cached
     
-    # Try to get existing limits
-    response = client.table("user_cost_limits")\
-        .select("*")\
-        .eq("user_id", user_id)\
-        .limit(1)\
-        .execute()
-    
-    if response.data and len(response.data) > 0:
-        limits = response.data[0]
-        
-        # Reset daily limits if needed
-        last_reset = datetime.fromisoformat(limits['last_reset_date']).date() if limits.get('last_reset_date') else date.today()
-        if last_reset < date.today():
-            reset_daily_limits(user_id)
-            # Fetch again after reset
-            response = client.table("user_cost_limits")\
-                .select("*")\
-                .eq("user_id", user_id)\
-                .limit(1)\
-                .execute()
-            if response.data and len(response.data) > 0:
-                return response.data[0]
-        
-        return limits
+    client = get_supabase_client()
     
-    # Create default limits
-    response = client.table("user_cost_limits")\
-        .insert({
-            "user_id": user_id,
-            "daily_ai_calls_limit": DEFAULT_DAILY_AI_CALLS,
-            "monthly_ai_calls_limit": DEFAULT_MONTHLY_AI_CALLS,
-            "daily_tokens_limit": DEFAULT_DAILY_TOKENS,
-            "last_reset_date": date.today().isoformat()
-        })\
-        .execute()
+    # Single round-trip: creates the default row on first use and resets the
+    # daily counters when last_reset_date is before today
+    response = client.rpc("get_or_init_user_cost_limits", {
+        "p_user_id": user_id,
+        "p_daily_ai_calls_limit": DEFAULT_DAILY_AI_CALLS,
+        "p_monthly_ai_calls_limit": DEFAULT_MONTHLY_AI_CALLS,
+        "p_daily_tokens_limit": DEFAULT_DAILY_TOKENS
+    }).execute()
     
-    if response.data and len(response.data) > 0:
-        return response.data[0]
+    if response.data:
+        with _limits_cache_lock:
+            _limits_cache[user_id] = response.data
+        return response.data
     
-    raise Exception("Failed to create user cost limits")
+    raise Exception("Failed to get or create user cost limits")
 
 
 def reset_daily_limits(user_id: str) -> None:
@@ -88,6 +92,8 @@ def reset_daily_limits(user_id: str) -> None:
         })\
         .eq("user_id", user_id)\
         .execute()
+    with _limits_cache_lock:
+        _limits_cache.pop(user_id, None)
 
 
 def check_ai_call_allowed(user_id: str, estimated_tokens: int = 150) -> Tuple[bool, Optional[str]]:
@@ -101,35 +107,36 @@ def check_ai_call_allowed(user_id: str, estimated_tokens: int = 150) -> Tuple[bo
     Returns:
         Tuple of (allowed: bool, reason: Optional[str])
     """
+    # Check safety boundaries before touching the database
+    if estimated_tokens > MAX_TOKENS_PER_CALL:
+        return False, f"Requested tokens ({estimated_tokens}) exceeds maximum per call ({MAX_TOKENS_PER_CALL})"
+    
     try:
         limits = get_user_cost_limits(user_id)
+        pending = get_pending_usage(user_id)
         
         # Check if user is blocked
         if limits.get('is_blocked', False):
             return False, limits.get('block_reason', 'User is blocked')
         
         # Check daily AI calls limit
-        daily_calls_used = limits.get('daily_ai_calls_used', 0)
+        daily_calls_used = limits.get('daily_ai_calls_used', 0) + pending["calls"]
         daily_calls_limit = limits.get('daily_ai_calls_limit', DEFAULT_DAILY_AI_CALLS)
         if daily_calls_used >= daily_calls_limit:
             return False, f"Daily AI call limit reached ({daily_calls_limit} calls)"
         
         # Check monthly AI calls limit
-        monthly_calls_used = limits.get('monthly_ai_calls_used', 0)
+        monthly_calls_used = limits.get('monthly_ai_calls_used', 0) + pending["calls"]
         monthly_calls_limit = limits.get('monthly_ai_calls_limit', DEFAULT_MONTHLY_AI_CALLS)
         if monthly_calls_used >= monthly_calls_limit:
             return False, f"Monthly AI call limit reached ({monthly_calls_limit} calls)"
         
         # Check daily tokens limit
-        daily_tokens_used = limits.get('daily_tokens_used', 0)
+        daily_tokens_used = limits.get('daily_tokens_used', 0) + pending["tokens"]
         daily_tokens_limit = limits.get('daily_tokens_limit', DEFAULT_DAILY_TOKENS)
         if daily_tokens_used + estimated_tokens > daily_tokens_limit:
             return False, f"Daily token limit would be exceeded ({daily_tokens_limit} tokens)"
         
-        # Check safety boundaries
-        if estimated_tokens > MAX_TOKENS_PER_CALL:
-            return False, f"Requested tokens ({estimated_tokens}) exceeds maximum per call ({MAX_TOKENS_PER_CALL})"
-        
         return True, None
         
     except Exception as e:
@@ -152,6 +159,9 @@ def record_ai_call(
     """
     Record an AI call for cost tracking.
     
+    The call is buffered in memory and written, together with any other
+    pending calls, by flush_pending_ai_calls() within USAGE_FLUSH_INTERVAL_SECONDS.
+    
     Args:
         user_id: User ID
         call_type: Type of call ('message_generation', 'memory_summarization', 'insight_generation')
@@ -163,50 +173,152 @@ def record_ai_call(
         cached: Whether response was from cache
         metadata: Additional metadata
     """
-    client = get_supabase_client()
-    
-    try:
-        # Log the call
-        client.table("ai_call_logs")\
-            .insert({
-                "user_id": user_id,
-                "call_type": call_type,
-                "tokens_generated": tokens_generated,
-                "tokens_input": tokens_input,
-                "model_path": "mlx-community/Llama-3.2-3B-Instruct",
-                "response_time_ms": response_time_ms,
-                "success": success,
-                "error_message": error_message,
-                "cached": cached,
-                "metadata": metadata or {}
-            })\
-            .execute()
+    with _pending_lock:
+        if len(_pending_calls) >= AI_CALL_BUFFER_MAX_SIZE:
+            logger.warning(f"AI call buffer full, dropping {call_type} call for user {user_id}")
+            return
+        
+        _pending_calls.append({
+            "user_id": user_id,
+            "call_type": call_type,
+            "tokens_generated": tokens_generated,
+            "tokens_input": tokens_input,
+            "model_path": AI_MODEL_PATH,
+            "response_time_ms": response_time_ms,
+            "success": success,
+            "error_message": error_message,
+            "cached": cached,
+            "metadata": metadata or {}
+        })
         
-        # Update user cost limits (only if successful and not cached)
+        # Only successful, uncached calls count against limits
         if success and not cached:
-            # Get current limits
-            limits = get_user_cost_limits(user_id)
-            
-            # Calculate new usage
-            new_daily_calls = limits.get('daily_ai_calls_used', 0) + 1
-            new_monthly_calls = limits.get('monthly_ai_calls_used', 0) + 1
-            new_daily_tokens = limits.get('daily_tokens_used', 0) + tokens_generated
-            
-            # Update limits
-            client.table("user_cost_limits")\
-                .update({
-                    "daily_ai_calls_used": new_daily_calls,
-                    "monthly_ai_calls_used": new_monthly_calls,
-                    "daily_tokens_used": new_daily_tokens
-                })\
-                .eq("user_id", user_id)\
-                .execute()
-            
-            logger.info(f"Recorded AI call for user {user_id}: {tokens_generated} tokens, {call_type}")
+            usage = _pending_usage[user_id]
+            usage["calls"] += 1
+            usage["tokens"] += tokens_generated
         
-    except Exception as e:
-        logger.error(f"Failed to record AI call: {e}", exc_info=True)
-        # Don't fail the request if logging fails
+        if len(_pending_calls) >= AI_CALL_BATCH_SIZE:
+            # Flush a full batch now, off the caller's thread
+            threading.Thread(target=flush_pending_ai_calls, daemon=True).start()
+        else:
+            _schedule_flush_locked()
+
+
+def get_pending_usage(user_id: str) -> Dict[str, int]:
+    """Get the calls and tokens recorded for a user but not yet flushed."""
+    with _pending_lock:
+        usage = _pending_usage.get(user_id)
+        return dict(usage) if usage else {"calls": 0, "tokens": 0}
+
+
+def _schedule_flush_locked() -> None:
+    """Start the flush timer if none is pending. Caller must hold _pending_lock."""
+    global _flush_timer
+    
+    if _flush_timer is None:
+        _flush_timer = threading.Timer(USAGE_FLUSH_INTERVAL_SECONDS, flush_pending_ai_calls)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+def _release_pending_usage(batch: List[Dict[str, Any]]) -> None:
+    """Stop counting a written batch as pending and drop its users' cached limits."""
+    with _pending_lock:
+        for call in batch:
+            if not call["success"] or call["cached"]:
+                continue
+            pending = _pending_usage.get(call["user_id"])
+            if pending is None:
+                continue
+            pending["calls"] -= 1
+            pending["tokens"] -= call["tokens_generated"]
+            if pending["calls"] <= 0 and pending["tokens"] <= 0:
+                del _pending_usage[call["user_id"]]
+    # The new counters are in user_cost_limits now, so re-read them
+    with _limits_cache_lock:
+        for call in batch:
+            _limits_cache.pop(call["user_id"], None)
+
+
+def flush_pending_ai_calls() -> None:
+    """Write all buffered AI calls and their usage increments, one RPC per AI_CALL_BATCH_SIZE calls.
+    
+    A batch's pending usage is only released once its RPC succeeds; failed
+    batches go back into the buffer, still counted, for the next flush.
+    """
+    global _flush_timer, _pending_calls
+    
+    with _pending_lock:
+        calls = _pending_calls
+        _pending_calls = []
+        _flush_timer = None
+    
+    if not calls:
+        return
+    
+    flushed = 0
+    failed: List[Dict[str, Any]] = []
+    for i in range(0, len(calls), AI_CALL_BATCH_SIZE):
+        batch = calls[i:i + AI_CALL_BATCH_SIZE]
+        try:
+            get_supabase_client().rpc("record_ai_calls", {"p_calls": batch}).execute()
+        except Exception as e:
+            # Don't fail the request if logging fails; retry on the next flush
+            logger.error(f"Failed to record {len(batch)} AI calls: {e}", exc_info=True)
+            failed.extend(batch)
+            continue
+        _release_pending_usage(batch)
+        flushed += len(batch)
+    
+    if failed:
+        with _pending_lock:
+            _pending_calls[:0] = failed
+            _schedule_flush_locked()
+    logger.info(f"Flushed {flushed} AI calls, {len(failed)} requeued")
+
+
+atexit.register(flush_pending_ai_calls)
+
+
+USAGE_STATS_MAX_LOG_ROWS = 10_000
+
+
+def _aggregate_usage_from_logs(user_id: str, days: int) -> Dict[str, Any]:
+    """Compute usage stats from raw call logs, fetching only the columns used."""
+    client = get_supabase_client()
+    cutoff_date = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    
+    logs_response = client.table("ai_call_logs")\
+        .select("success, cached, tokens_generated, response_time_ms")\
+        .eq("user_id", user_id)\
+        .gte("created_at", cutoff_date)\
+        .order("created_at", desc=True)\
+        .limit(USAGE_STATS_MAX_LOG_ROWS)\
+        .execute()
+    
+    logs = logs_response.data if logs_response.data else []
+    
+    # Single pass over the rows for all counters
+    successful_calls = cached_calls = total_tokens = 0
+    response_time_total = response_time_count = 0
+    for l in logs:
+        if l.get('success', True):
+            successful_calls += 1
+        if l.get('cached', False):
+            cached_calls += 1
+        total_tokens += l.get('tokens_generated') or 0
+        response_time = l.get('response_time_ms')
+        if response_time is not None:
+            response_time_total += response_time
+            response_time_count += 1
+    
+    return {
+        "total_calls": len(logs),
+        "successful_calls": successful_calls,
+        "cached_calls": cached_calls,
+        "total_tokens": total_tokens,
+        "avg_response_time_ms": response_time_total / response_time_count if response_time_count else 0
+    }
 
 
 def get_user_usage_stats(user_id: str, days: int = 7) -> Dict[str, Any]:
@@ -221,34 +333,28 @@ def get_user_usage_stats(user_id: str, days: int = 7) -> Dict[str, Any]:
         Dict with usage statistics
     """
     client = get_supabase_client()
-    cutoff_date = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
     
     try:
-        # Get call logs
-        logs_response = client.table("ai_call_logs")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .gte("created_at", cutoff_date)\
-            .execute()
-        
-        logs = logs_response.data if logs_response.data else []
-        
-        # Calculate stats
-        total_calls = len(logs)
-        successful_calls = len([l for l in logs if l.get('success', True)])
-        cached_calls = len([l for l in logs if l.get('cached', False)])
-        total_tokens = sum(l.get('tokens_generated', 0) for l in logs)
-        avg_response_time = sum(l.get('response_time_ms', 0) for l in logs) / max(total_calls, 1)
+        # Aggregate call logs server-side (one row instead of every log)
+        try:
+            stats_response = client.rpc("get_usage_stats_agg", {
+                "p_user_id": user_id,
+                "p_days": days
+            }).execute()
+            stats = stats_response.data or {}
+        except Exception as e:
+            logger.warning(f"Usage stats RPC failed, aggregating logs client-side: {e}")
+            stats = _aggregate_usage_from_logs(user_id, days)
         
         # Get current limits
         limits = get_user_cost_limits(user_id)
         
         return {
-            "total_calls": total_calls,
-            "successful_calls": successful_calls,
-            "cached_calls": cached_calls,
-            "total_tokens": total_tokens,
-            "avg_response_time_ms": round(avg_response_time, 2),
+            "total_calls": stats.get('total_calls', 0),
+            "successful_calls": stats.get('successful_calls', 0),
+            "cached_calls": stats.get('cached_calls', 0),
+            "total_tokens": stats.get('total_tokens', 0),
+            "avg_response_time_ms": round(float(stats.get('avg_response_time_ms') or 0), 2),
             "daily_calls_used": limits.get('daily_ai_calls_used', 0),
             "daily_calls_limit": limits.get('daily_ai_calls_limit', DEFAULT_DAILY_AI_CALLS),
             "monthly_calls_used": limits.get('monthly_ai_calls_used', 0),
@@ -5,72 +5,97 @@ This improves the OpenAI responses immediately while custom model training is pr
 
 import json
 import random
-from typing import Dict, List, Any
+import re
+from typing import Dict, List, Any, Tuple
+
+# Dedicated generator; bound method avoids the module attribute lookup per call
+_choice = random.Random().choice
+
+# Emotional indicators in the user's message (substring match, case-insensitive)
+_STRUGGLING_RE = re.compile(r'struggling|hard|difficult|overwhelm', re.IGNORECASE)
+_MOTIVATED_RE = re.compile(r'motivated|excited|ready|energy', re.IGNORECASE)
+
 
 class EnhancedCoachPrompts:
     """Enhanced prompt system for more natural coach responses"""
     
+    __slots__ = (
+        'coaching_styles',
+        'response_variations',
+        'personality_traits',
+        '_prompt_template',
+        '_resp_struggling',
+        '_resp_motivated',
+        '_resp_slipping',
+        '_resp_locked_in',
+    )
+    
     def __init__(self):
         self.coaching_styles = self._load_coaching_styles()
         self.response_variations = self._load_response_variations()
         self.personality_traits = self._load_personality_traits()
+        self._prompt_template = self._build_prompt_template()
+        self._resp_struggling, self._resp_motivated, self._resp_slipping, self._resp_locked_in = (
+            self.response_variations[key]
+            for key in ('struggling_responses', 'motivated_responses', 'slipping_responses', 'locked_in_responses')
+        )
     
-    def _load_coaching_styles(self) -> Dict[str, List[str]]:
+    def _load_coaching_styles(self) -> Dict[str, Tuple[str, ...]]:
         """Load different coaching communication styles"""
         return {
-            "direct_accountability": [
+            "direct_accountability": (
                 "I need you to be straight with me right now",
                 "Let's cut to the chase",
                 "No sugarcoating - what exactly is going on?",
                 "I want the honest truth, not the polished version"
-            ],
-            "encouraging_challenge": [
+            ),
+            "encouraging_challenge": (
                 "I've seen you do incredible things when you put your mind to it",
                 "You're stronger than this moment feels",
                 "This is exactly the kind of challenge you thrive on",
                 "I believe in your ability to push through this"
-            ],
-            "practical_action": [
+            ),
+            "practical_action": (
                 "Here's what we're going to do about it",
                 "Let's make this simple and actionable",
                 "Focus on the next concrete step",
                 "What's the smallest thing you can do right now?"
-            ],
-            "pattern_calling": [
+            ),
+            "pattern_calling": (
                 "I've noticed this pattern before",
                 "This feels familiar - what usually happens next?",
                 "You do this thing where you...",
                 "I see what's happening here"
-            ]
+            )
         }
     
-    def _load_response_variations(self) -> Dict[str, List[str]]:
+    def _load_response_variations(self) -> Dict[str, Tuple[str, ...]]:
         """Load varied response patterns to avoid repetition"""
         return {
-            "struggling_responses": [
+            "struggling_responses": (
                 "I hear you. This feels heavy right now.",
                 "Struggling is part of the process - what usually gets you through?",
                 "Tough day, but you're still here. That's something.",
                 "I've seen you come back from harder spots than this."
-            ],
-            "motivated_responses": [
+            ),
+            "motivated_responses": (
                 "That energy is exactly what I love seeing in you",
                 "Now THAT'S the version of you I know",
                 "Your motivation is contagious - what's sparking it?",
                 "This is when you really shine"
-            ],
-            "slipping_responses": [
+            ),
+            "slipping_responses": (
                 "I see you starting to drift. What's pulling you away?",
                 "This feels like the beginning of a familiar pattern",
                 "You're better than this - what's getting in your way?",
                 "I can see you checking out. Let's reel it back in."
-            ],
-            "locked_in_responses": [
+            ),
+            "locked_in_responses": (
                 "This is incredible focus - what's driving this momentum?",
                 "You're in beast mode right now",
                 "This is the energy that gets results",
                 "I'm watching you crush it - keep this going"
-            ]
+            )
         }
     
     def _load_personality_traits(self) -> Dict[str, Any]:
@@ -113,17 +138,11 @@ class EnhancedCoachPrompts:
             }
         }
     
-    def generate_enhanced_prompt(self, context: Dict[str, Any], user_message: str, user_state: Dict[str, Any]) -> str:
-        """Generate enhanced prompt with personal coaching style"""
-        
-        # Determine coaching approach based on user state
-        coaching_approach = self._determine_coaching_approach(user_state)
-        
-        # Get appropriate response variations
-        response_style = self._get_response_style(user_state, user_message)
-        
-        # Build enhanced system prompt
-        system_prompt = f"""You are an accountability coach with a very specific communication style and personality. 
+    def _build_prompt_template(self) -> str:
+        """Bake personality traits into the system prompt, leaving per-request placeholders"""
+        communication_style = self.personality_traits['communication_style']
+        coaching_approach = self.personality_traits['coaching_approach']
+        return f"""You are an accountability coach with a very specific communication style and personality. 
 
 PERSONALITY TRAITS:
 - Direct but caring communication
@@ -134,22 +153,22 @@ PERSONALITY TRAITS:
 - You use natural, conversational language
 
 COMMUNICATION STYLE:
-- Tone: {self.personality_traits['communication_style']['tone']}
-- Energy: {self.personality_traits['communication_style']['energy']}
-- Formality: {self.personality_traits['communication_style']['formality']}
+- Tone: {communication_style['tone']}
+- Energy: {communication_style['energy']}
+- Formality: {communication_style['formality']}
 
 COACHING APPROACH:
-- Accountability Level: {self.personality_traits['coaching_approach']['accountability_level']}
-- Support Style: {self.personality_traits['coaching_approach']['support_style']}
-- Challenge Method: {self.personality_traits['coaching_approach']['challenge_method']}
+- Accountability Level: {coaching_approach['accountability_level']}
+- Support Style: {coaching_approach['support_style']}
+- Challenge Method: {coaching_approach['challenge_method']}
 
 CURRENT USER CONTEXT:
-- Current Streak: {user_state.get('current_streak', 0)} days
-- Recent Pattern: {user_state.get('recent_pattern', 'unknown')}
-- User Message: "{user_message}"
+- Current Streak: {{current_streak}} days
+- Recent Pattern: {{recent_pattern}}
+- User Message: "{{user_message}}"
 
 RESPONSE STYLE FOR THIS SITUATION:
-{response_style}
+{{response_style}}
 
 IMPORTANT:
 - Match the user's energy level (if they're struggling, be supportive but direct; if motivated, match their enthusiasm)
@@ -160,67 +179,64 @@ IMPORTANT:
 - Keep responses concise but impactful
 
 Respond as this specific accountability coach personality."""
-        
-        return system_prompt
     
-    def _determine_coaching_approach(self, user_state: Dict[str, Any]) -> str:
-        """Determine the best coaching approach based on user state"""
+    def generate_enhanced_prompt(self, context: Dict[str, Any], user_message: str, user_state: Dict[str, Any]) -> str:
+        """Generate enhanced prompt with personal coaching style"""
+        
         pattern = user_state.get('recent_pattern', 'unknown')
         streak = user_state.get('current_streak', 0)
         
-        if pattern == 'struggling':
-            return 'supportive_challenge'
-        elif pattern == 'slipping':
-            return 'pattern_calling'
-        elif pattern == 'locked_in':
-            return 'momentum_building'
-        elif streak > 5:
-            return 'consistency_maintenance'
-        else:
-            return 'engagement_building'
+        # Get appropriate response variations
+        response_style = self._get_response_style(pattern, user_message)
+        
+        # Only the per-request fields are interpolated; the rest is prebuilt
+        system_prompt = self._prompt_template.format(
+            current_streak=streak,
+            recent_pattern=pattern,
+            user_message=user_message,
+            response_style=response_style
+        )
+        
+        return system_prompt
     
-    def _get_response_style(self, user_state: Dict[str, Any], user_message: str) -> str:
+    def _get_response_style(self, pattern: str, user_message: str) -> str:
         """Get appropriate response style based on situation"""
-        pattern = user_state.get('recent_pattern', 'unknown')
-        message_lower = user_message.lower()
-        
         # Check for emotional indicators in message
-        if any(word in message_lower for word in ['struggling', 'hard', 'difficult', 'overwhelm']):
-            return f"User is struggling. Use supportive but direct responses like: {random.choice(self.response_variations['struggling_responses'])}"
-        elif any(word in message_lower for word in ['motivated', 'excited', 'ready', 'energy']):
-            return f"User is motivated. Match their energy: {random.choice(self.response_variations['motivated_responses'])}"
+        if _STRUGGLING_RE.search(user_message):
+            return f"User is struggling. Use supportive but direct responses like: {_choice(self._resp_struggling)}"
+        elif _MOTIVATED_RE.search(user_message):
+            return f"User is motivated. Match their energy: {_choice(self._resp_motivated)}"
         elif pattern == 'slipping':
-            return f"User is slipping into old patterns. Use pattern-calling responses: {random.choice(self.response_variations['slipping_responses'])}"
+            return f"User is slipping into old patterns. Use pattern-calling responses: {_choice(self._resp_slipping)}"
         elif pattern == 'locked_in':
-            return f"User is locked in and focused. Build on momentum: {random.choice(self.response_variations['locked_in_responses'])}"
+            return f"User is locked in and focused. Build on momentum: {_choice(self._resp_locked_in)}"
         else:
             return "Use your natural coaching style - direct, actionable, and focused on next steps."
     
     def get_coaching_phrase(self, category: str) -> str:
         """Get a random coaching phrase from specific category"""
         if category in self.coaching_styles:
-            return random.choice(self.coaching_styles[category])
+            return _choice(self.coaching_styles[category])
         return ""
     
     def enhance_user_context(self, context: Dict[str, Any]) -> Dict[str, Any]:
         """Enhance context with coaching-relevant insights"""
-        enhanced = context.copy()
+        if 'user_state' not in context:
+            return context.copy()
         
-        # Add coaching-specific insights
-        if 'user_state' in enhanced:
-            user_state = enhanced['user_state']
-            
-            # Determine coaching pressure level
-            if user_state.get('current_streak', 0) > 7:
-                enhanced['coaching_pressure'] = 'maintain_momentum'
-            elif user_state.get('recent_pattern') == 'struggling':
-                enhanced['coaching_pressure'] = 'gentle_challenge'
-            elif user_state.get('recent_pattern') == 'slipping':
-                enhanced['coaching_pressure'] = 'direct_intervention'
-            else:
-                enhanced['coaching_pressure'] = 'balanced_support'
+        # Determine coaching pressure level
+        user_state = context['user_state']
+        pattern = user_state.get('recent_pattern')
+        if user_state.get('current_streak', 0) > 7:
+            pressure = 'maintain_momentum'
+        elif pattern == 'struggling':
+            pressure = 'gentle_challenge'
+        elif pattern == 'slipping':
+            pressure = 'direct_intervention'
+        else:
+            pressure = 'balanced_support'
         
-        return enhanced
+        return {**context, 'coaching_pressure': pressure}
 
 # Global instance
 enhanced_prompts = EnhancedCoachPrompts()
\ No newline at end of file
@@ -5,6 +5,7 @@ Provides graceful degradation and fallback mechanisms.
 
 from typing import Dict, Any, Optional, Tuple
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +19,18 @@ FALLBACK_RESPONSES = {
     "invalid_input": "I'm not sure how to respond to that. Can you ask me something else?",
 }
 
+_FALLBACK_DEFAULT = FALLBACK_RESPONSES["error"]
+# Lowercased variants used after a "Hey {name}, " greeting
+_FALLBACK_LOWERED = {key: text.lower() for key, text in FALLBACK_RESPONSES.items()}
+_FALLBACK_DEFAULT_LOWERED = _FALLBACK_LOWERED["error"]
+
+# Error message keywords per failure type, checked in priority order after timeouts
+_TIMEOUT_RE = re.compile(r"timeout", re.IGNORECASE)
+_FAILURE_PATTERNS = (
+    ("cost_limit", re.compile(r"limit|quota", re.IGNORECASE)),
+    ("model_unavailable", re.compile(r"model|load", re.IGNORECASE)),
+)
+
 
 def get_fallback_response(failure_type: str, context: Optional[Dict[str, Any]] = None) -> str:
     """
@@ -30,15 +43,13 @@ def get_fallback_response(failure_type: str, context: Optional[Dict[str, Any]] =
     Returns:
         Fallback response text
     """
-    base_response = FALLBACK_RESPONSES.get(failure_type, FALLBACK_RESPONSES["error"])
-    
     # Customize based on context if needed
     if context:
         user_name = context.get('user_name')
         if user_name:
-            base_response = f"Hey {user_name}, {base_response.lower()}"
+            return f"Hey {user_name}, {_FALLBACK_LOWERED.get(failure_type, _FALLBACK_DEFAULT_LOWERED)}"
     
-    return base_response
+    return FALLBACK_RESPONSES.get(failure_type, _FALLBACK_DEFAULT)
 
 
 def handle_ai_generation_failure(
@@ -65,14 +76,13 @@ def handle_ai_generation_failure(
     logger.error(f"AI generation failure for user {user_id}: {error_type} - {error_message}")
     
     # Determine failure type
-    if "timeout" in error_message.lower() or "time" in error_type.lower():
+    if _TIMEOUT_RE.search(error_message) or "time" in error_type.lower():
         failure_type = "timeout"
-    elif "limit" in error_message.lower() or "quota" in error_message.lower():
-        failure_type = "cost_limit"
-    elif "model" in error_message.lower() or "load" in error_message.lower():
-        failure_type = "model_unavailable"
     else:
-        failure_type = "error"
+        failure_type = next(
+            (name for name, pattern in _FAILURE_PATTERNS if pattern.search(error_message)),
+            "error"
+        )
     
     fallback_response = get_fallback_response(failure_type, context)
     
@@ -118,25 +128,32 @@ def validate_response_quality(response_text: str) -> Tuple[bool, Optional[str]]:
     Returns:
         Tuple of (is_valid: bool, reason: Optional[str])
     """
+    if not response_text:
+        return False, "Response is empty"
+    
+    stripped = response_text.strip()
+    length = len(response_text)
+    
     # Check for empty response
-    if not response_text or len(response_text.strip()) < 1:
+    if not stripped:
         return False, "Response is empty"
     
     # Check for error markers
-    if response_text.startswith("[") and response_text.endswith("]"):
+    if response_text[0] == "[" and response_text[-1] == "]":
         return False, "Response contains error marker"
     
     # Check for excessive length (safety boundary)
-    if len(response_text) > 1000:  # MAX_MESSAGE_LENGTH
-        return False, f"Response too long ({len(response_text)} chars, max 1000)"
+    if length > 1000:  # MAX_MESSAGE_LENGTH
+        return False, f"Response too long ({length} chars, max 1000)"
     
-    # Check for repetitive content
-    words = response_text.split()
-    if len(words) > 10 and len(set(words)) < 3:
-        return False, "Response is too repetitive"
+    # Check for repetitive content (more than 10 words needs at least 21 chars)
+    if len(stripped) > 20:
+        words = stripped.split()
+        if len(words) > 10 and len(set(words)) < 3:
+            return False, "Response is too repetitive"
     
     # Check for only special characters
-    if len(set(response_text.strip())) < 3:
+    if len(set(stripped)) < 3:
         return False, "Response contains too few unique characters"
     
     return True, None
@@ -3,18 +3,60 @@ Goal Management Service
 Manages wellness goals and tracks progress
 """
 
+import asyncio
 import logging
-from datetime import date, datetime
+from collections import defaultdict
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional
 
+from cachetools import TTLCache
+
 from backend.database.supabase_client import get_supabase_client
 
 logger = logging.getLogger(__name__)
 
+# Suggestions only depend on the wellness score, which doesn't move within a minute
+SUGGESTIONS_CACHE_TTL_SECONDS = 60
+
+# Goal types backed by health_metrics rows
+_METRIC_TYPE_MAP = {
+    'steps': 'steps',
+    'sleep': 'sleep_duration',
+    'water': 'water_intake',
+    'activity': 'steps'
+}
+
+# Goal types backed by manual_health_logs rows
+_LOG_TYPE_MAP = {
+    'water': 'water',
+    'mood': 'mood',
+    'stress': 'stress'
+}
+
+_DEFAULT_UNITS = {
+    'steps': 'steps',
+    'sleep': 'hours',
+    'water': 'ml',
+    'mood': 'rating',
+    'stress': 'rating',
+    'nutrition': 'calories',
+    'activity': 'minutes'
+}
+
+
+def _to_float(value) -> float:
+    """Convert to float, skipping the conversion for values that already are"""
+    return value if type(value) is float else float(value)
+
 
 class GoalManagementService:
     """Service for managing wellness goals"""
     
+    __slots__ = ('_suggestions_cache',)
+    
+    def __init__(self):
+        self._suggestions_cache: TTLCache = TTLCache(maxsize=10_000, ttl=SUGGESTIONS_CACHE_TTL_SECONDS)
+    
     @property
     def supabase(self):
         """Get the current Supabase client (always fresh after a reset)."""
@@ -60,14 +102,11 @@ class GoalManagementService:
             
             goals = []
             if response.data:
-                for goal in response.data:
+                # Current values for every goal from at most two queries
+                current_values = await asyncio.to_thread(self._calculate_current_values, user_id, response.data)
+                for goal, current_value in zip(response.data, current_values):
                     formatted = self._format_goal(goal)
-                    # Update current value based on recent data
-                    formatted['current_value'] = await self._calculate_current_value(
-                        user_id, 
-                        goal['goal_type'],
-                        goal['period']
-                    )
+                    formatted['current_value'] = current_value
                     formatted['progress_percentage'] = self._calculate_progress(
                         formatted['current_value'],
                         formatted['target_value']
@@ -113,6 +152,10 @@ class GoalManagementService:
     
     async def get_goal_suggestions(self, user_id: str) -> List[Dict]:
         """Get suggested goals based on user's data"""
+        cached = self._suggestions_cache.get(user_id)
+        if cached is not None:
+            return cached
+        
         try:
             suggestions = []
             
@@ -148,90 +191,95 @@ class GoalManagementService:
                     'suggestion_reason': 'Improve hydration'
                 })
             
+            self._suggestions_cache[user_id] = suggestions
             return suggestions
             
         except Exception as e:
             logger.error(f"Error getting goal suggestions: {e}")
             return []
     
-    async def _calculate_current_value(
-        self, 
-        user_id: str, 
-        goal_type: str, 
-        period: str
-    ) -> float:
-        """Calculate current value for a goal"""
+    def _calculate_current_values(self, user_id: str, goals: List[Dict]) -> List[float]:
+        """Calculate current values for a list of goals with one query per data source (blocking; run in a thread)"""
         try:
-            if period == 'daily':
-                target_date = date.today()
-            elif period == 'weekly':
-                # Get current week's data
-                target_date = date.today()
-            else:
-                target_date = date.today()
-            
-            # Map goal types to metric types
-            metric_type_map = {
-                'steps': 'steps',
-                'sleep': 'sleep_duration',
-                'water': 'water_intake',
-                'activity': 'steps'
-            }
-            
-            metric_type = metric_type_map.get(goal_type)
-            if not metric_type:
-                return 0.0
+            today = date.today()
+            goal_starts = [self._period_start(g['period'], today) for g in goals]
+            query_start = min(goal_starts).isoformat()
+            query_end = (today + timedelta(days=1)).isoformat()
             
-            # Get data for today or this week
-            if period == 'daily':
-                start_date = target_date
-                end_date = target_date
-            else:
-                start_date = target_date
-                end_date = target_date
+            metric_types = {_METRIC_TYPE_MAP[g['goal_type']] for g in goals if g['goal_type'] in _METRIC_TYPE_MAP}
+            if not metric_types:
+                return [0.0] * len(goals)
             
-            # Check health_metrics
-            response = self.supabase.table('health_metrics').select('*').eq(
+            # (day, value) pairs per metric type, filtered per goal window below
+            metric_rows: Dict[str, List[tuple]] = defaultdict(list)
+            response = self.supabase.table('health_metrics').select('metric_type, value, recorded_at').eq(
                 'user_id', user_id
-            ).eq('metric_type', metric_type).gte(
-                'recorded_at', start_date.isoformat()
-            ).lte('recorded_at', end_date.isoformat()).execute()
+            ).in_('metric_type', list(metric_types)).gte(
+                'recorded_at', query_start
+            ).lt('recorded_at', query_end).execute()
+            for m in response.data or []:
+                metric_rows[m['metric_type']].append((m['recorded_at'][:10], _to_float(m['value'])))
             
-            if response.data:
-                if period == 'daily':
-                    return sum(float(m['value']) for m in response.data)
-                else:
-                    # Average for period
-                    values = [float(m['value']) for m in response.data]
-                    return sum(values) / len(values) if values else 0.0
+            metric_values = [
+                self._values_since(metric_rows.get(_METRIC_TYPE_MAP.get(g['goal_type'])), start)
+                for g, start in zip(goals, goal_starts)
+            ]
             
-            # Check manual logs
-            log_type_map = {
-                'water': 'water',
-                'mood': 'mood',
-                'stress': 'stress'
+            # Manual logs are only consulted for goals with no health_metrics data
+            log_types = {
+                _LOG_TYPE_MAP[g['goal_type']] for g, values in zip(goals, metric_values)
+                if g['goal_type'] in _LOG_TYPE_MAP
+                and g['goal_type'] in _METRIC_TYPE_MAP
+                and not values
             }
-            
-            log_type = log_type_map.get(goal_type)
-            if log_type:
-                log_response = self.supabase.table('manual_health_logs').select('*').eq(
+            log_rows: Dict[str, List[tuple]] = defaultdict(list)
+            if log_types:
+                log_response = self.supabase.table('manual_health_logs').select('log_type, value, logged_at').eq(
                     'user_id', user_id
-                ).eq('log_type', log_type).gte(
-                    'logged_at', start_date.isoformat()
-                ).lte('logged_at', end_date.isoformat()).execute()
-                
-                if log_response.data:
-                    if period == 'daily':
-                        return sum(float(m.get('value', 0)) for m in log_response.data)
-                    else:
-                        values = [float(m.get('value', 0)) for m in log_response.data]
-                        return sum(values) / len(values) if values else 0.0
+                ).in_('log_type', list(log_types)).gte(
+                    'logged_at', query_start
+                ).lt('logged_at', query_end).execute()
+                for m in log_response.data or []:
+                    log_rows[m['log_type']].append((m['logged_at'][:10], _to_float(m.get('value', 0))))
             
-            return 0.0
+            current_values = []
+            for goal, start, values in zip(goals, goal_starts, metric_values):
+                if goal['goal_type'] not in _METRIC_TYPE_MAP:
+                    current_values.append(0.0)
+                    continue
+                if not values:
+                    values = self._values_since(log_rows.get(_LOG_TYPE_MAP.get(goal['goal_type'])), start)
+                current_values.append(self._aggregate_period_values(values, goal['period']))
+            
+            return current_values
             
         except Exception as e:
-            logger.error(f"Error calculating current value: {e}")
+            logger.error(f"Error calculating current values: {e}")
+            return [0.0] * len(goals)
+    
+    @staticmethod
+    def _period_start(period: str, today: date) -> date:
+        """First day counted towards a goal: Monday of this week for weekly goals, otherwise today"""
+        if period == 'weekly':
+            return today - timedelta(days=today.weekday())
+        return today
+    
+    @staticmethod
+    def _values_since(rows: Optional[List[tuple]], start: date) -> List[float]:
+        """Values from (day, value) rows on or after start"""
+        if not rows:
+            return []
+        start_iso = start.isoformat()
+        return [value for day, value in rows if day >= start_iso]
+    
+    @staticmethod
+    def _aggregate_period_values(values: List[float], period: str) -> float:
+        """Sum values for daily goals, average them for longer periods"""
+        if not values:
             return 0.0
+        if period == 'daily':
+            return sum(values)
+        return sum(values) / len(values)
     
     def _calculate_progress(self, current: float, target: float) -> float:
         """Calculate progress percentage"""
@@ -245,8 +293,8 @@ class GoalManagementService:
         return {
             'id': goal['id'],
             'goal_type': goal['goal_type'],
-            'target_value': float(goal['target_value']),
-            'current_value': float(goal.get('current_value', 0)),
+            'target_value': _to_float(goal['target_value']),
+            'current_value': _to_float(goal.get('current_value', 0)),
             'unit': goal['unit'],
             'period': goal['period'],
             'start_date': goal['start_date'],
@@ -255,18 +303,10 @@ class GoalManagementService:
             'created_at': goal['created_at']
         }
     
-    def _get_default_unit(self, goal_type: str) -> str:
+    @staticmethod
+    def _get_default_unit(goal_type: str) -> str:
         """Get default unit for goal type"""
-        units = {
-            'steps': 'steps',
-            'sleep': 'hours',
-            'water': 'ml',
-            'mood': 'rating',
-            'stress': 'rating',
-            'nutrition': 'calories',
-            'activity': 'minutes'
-        }
-        return units.get(goal_type, 'units')
+        return _DEFAULT_UNITS.get(goal_type, 'units')
 
 
 # Global instance
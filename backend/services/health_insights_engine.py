@@ -7,10 +7,14 @@ from user_health_data to generate immediate insights.
 import asyncio
 import logging
 from dataclasses import dataclass
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, timedelta, timezone
 from enum import Enum
-from statistics import pstdev
-from typing import Dict, List, Optional, Tuple
+from functools import lru_cache, partial
+from math import sqrt
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import orjson
+from cachetools import TTLCache
 
 from backend.database.supabase_client import get_supabase_client
 
@@ -34,7 +38,19 @@ class PatternType(Enum):
     STRESS_PATTERN = "stress_pattern"
 
 
-@dataclass
+# Display order of insight cards
+_PATTERN_ORDER = {
+    PatternType.SLEEP_PATTERN: 0,
+    PatternType.ACTIVITY_CONSISTENCY: 1,
+    PatternType.ENERGY_WINDOWS: 2,
+    PatternType.MOOD_PATTERN: 3,
+    PatternType.CHECKIN_ENERGY_PATTERN: 4,
+    PatternType.STRESS_PATTERN: 5,
+    PatternType.PEAK_PERFORMANCE: 6,
+}
+
+
+@dataclass(slots=True, frozen=True)
 class PatternEvidence:
     type: PatternType
     labels: List[str]
@@ -44,7 +60,20 @@ class PatternEvidence:
     trend_value: Optional[str]
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
+class HealthSeries:
+    """Filtered views of the daily health rows, built once and shared by the analyzers."""
+    rows: List[Dict]
+    by_date: Dict[date, Dict]
+    days_with_data: int
+    sleep_rows: List[Dict]  # sleep_duration_hours > 0
+    sleep_by_date: Dict[str, float]
+    schedule_rows: List[Dict]  # both bedtime and wake time recorded
+    step_rows: List[Dict]  # steps > 0
+    step_values: List[float]
+
+
+@dataclass(slots=True)
 class HealthInsight:
     id: str
     type: InsightType
@@ -64,14 +93,103 @@ class HealthInsight:
 MIN_DAYS_FOR_INSIGHTS = 3  # Lowered from 7 to show insights sooner
 MAX_DAYS = 14
 
+# Raw health_metrics types folded into daily rows by the fallback aggregation
+_AGGREGATED_METRIC_TYPES = ["sleep_duration", "sleep_start", "sleep_end", "steps", "active_energy"]
+
+# Insights only move when new health data or check-ins arrive (which
+# invalidate the entry), so dashboard polls can reuse a result for a while.
+INSIGHTS_CACHE_TTL_SECONDS = 600
+INSIGHTS_CACHE_MAX_SIZE = 10_000
+
+
+def _pstdev(values: List[float], mean: float) -> float:
+    """Population standard deviation around an already computed mean.
+
+    statistics.pstdev re-derives the mean with exact fractions, which is far
+    slower than needed for a handful of daily values.
+    """
+    return sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+
+
+@lru_cache(maxsize=64)
+def _coach_summary(count: int, has_risk: bool) -> Optional[str]:
+    """Summary line for the insights card; only a handful of distinct inputs exist."""
+    if not count:
+        return None
+    if count == 1 and has_risk:
+        return "Went through your data from this week. One thing stood out that you should look at."
+    if count == 1:
+        return "Had a look at your week. Spotted something worth knowing about."
+    if has_risk:
+        return f"Checked your data from the past week. {count} patterns came up and a couple need your attention."
+    return f"Looked through your week. Found {count} things worth flagging, nothing mad though."
+
+
+@lru_cache(maxsize=8)
+def _last_7_days(end_ordinal: int) -> Tuple[Tuple[date, ...], Tuple[str, ...]]:
+    """Dates and weekday labels for the 7 days ending on the given day (by ordinal)."""
+    end = date.fromordinal(end_ordinal)
+    days = tuple(end - timedelta(days=delta) for delta in reversed(range(7)))
+    return days, tuple(d.strftime("%a") for d in days)
+
+
+# "Mon" .. "Sun", indexed by date.weekday()
+_WEEKDAY_LABELS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_WEEKDAY_INDEX = {name: i for i, name in enumerate(_WEEKDAY_LABELS)}
+
+# "12am" .. "11pm", indexed by hour of day
+_HOUR_LABELS = tuple(f"{h % 12 or 12}{'am' if h < 12 else 'pm'}" for h in range(24))
+
+
+def _utc_start_date(days: int) -> str:
+    """First day (ISO) of a window of `days` days ending today in UTC, matching stored timestamps."""
+    return (datetime.now(timezone.utc).date() - timedelta(days=days - 1)).isoformat()
+
+
+@lru_cache(maxsize=256)
+def _parse_date_str(value: str) -> Optional[date]:
+    """Parse a YYYY-MM-DD string; the same few dates are parsed by every analyzer."""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except Exception:
+        return None
+
 
 class HealthInsightsEngine:
+    def __init__(self):
+        # user_id -> orjson-encoded get_active_insights result
+        self._cache: TTLCache = TTLCache(maxsize=INSIGHTS_CACHE_MAX_SIZE, ttl=INSIGHTS_CACHE_TTL_SECONDS)
+        # user_id -> invalidation count, so a compute that overlapped an invalidate isn't cached.
+        # Expires with the insights cache: an older generation has nothing left to guard.
+        self._generation: TTLCache = TTLCache(maxsize=INSIGHTS_CACHE_MAX_SIZE, ttl=INSIGHTS_CACHE_TTL_SECONDS)
+        # Pattern writes still in flight (held so they aren't garbage collected)
+        self._bg_tasks: Set[asyncio.Task] = set()
+
     @property
     def supabase(self):
         """Get the current Supabase client (always fresh after a reset)."""
         return get_supabase_client()
 
+    def invalidate(self, user_id: str):
+        """Drop cached insights for a user after new health data or check-ins"""
+        self._generation[user_id] = self._generation.get(user_id, 0) + 1
+        self._cache.pop(user_id, None)
+
+    def _store(self, user_id: str, generation: int, payload: bytes):
+        """Cache a computed payload unless the user was invalidated while it was computed"""
+        if self._generation.get(user_id, 0) == generation:
+            self._cache[user_id] = payload
+
     async def get_active_insights(self, user_id: str) -> Dict:
+        return orjson.loads(await self.get_active_insights_json(user_id))
+
+    async def get_active_insights_json(self, user_id: str) -> bytes:
+        """Insights response already encoded as JSON, so cache hits skip encoding entirely."""
+        cached = self._cache.get(user_id)
+        if cached is not None:
+            return cached
+
+        generation = self._generation.get(user_id, 0)
         try:
             logger.info(f"[HealthInsights] Getting active insights for user {user_id}")
 
@@ -81,139 +199,129 @@ class HealthInsightsEngine:
                 self._fetch_user_metrics_data(user_id, days=MAX_DAYS),
             )
 
-            days_with_health = self._count_days_with_data(health_data)
+            series = self._health_series(health_data)
+            days_with_health = series.days_with_data
             days_with_metrics = self._count_days_with_metrics(metrics_data)
             days_with_data = max(days_with_health, days_with_metrics)
 
             logger.info(f"[HealthInsights] Health days: {days_with_health}, Metrics days: {days_with_metrics}, min_required: {MIN_DAYS_FOR_INSIGHTS}")
 
             if days_with_data < MIN_DAYS_FOR_INSIGHTS:
-                return {
+                payload = orjson.dumps({
                     "coach_summary": None,
                     "patterns": [],
                     "has_enough_data": False,
                     "days_until_enough_data": max(1, MIN_DAYS_FOR_INSIGHTS - days_with_data),
-                }
-
-            # Run all analyzers in parallel (4 health-based + 3 check-in based)
-            results = await asyncio.gather(
-                # Existing health-based analyzers
-                self._analyze_sleep_patterns(user_id, health_data, metrics_data),
-                self._analyze_energy_windows(user_id, health_data),
-                self._analyze_activity_consistency(user_id, health_data),
-                self._analyze_peak_performance(user_id, health_data, metrics_data),
-                # Check-in based analyzers
-                self._analyze_mood_patterns(user_id, metrics_data),
-                self._analyze_checkin_energy_patterns(user_id, metrics_data, health_data),
-                self._analyze_stress_patterns(user_id, metrics_data),
-                return_exceptions=True,
-            )
-
-            pattern_names = [
-                "sleep", "energy_windows", "activity", "peak_performance",
-                "mood", "checkin_energy", "stress"
-            ]
+                })
+                self._store(user_id, generation, payload)
+                return payload
+
+            # Only schedule analyzers whose inputs can meet their minimum row counts;
+            # sleep and peak performance combine sources, so they always run
+            mood_days = energy_days = stress_days = 0
+            for row in metrics_data:
+                mood_days += row.get("avg_mood") is not None
+                energy_days += row.get("avg_energy") is not None
+                stress_days += row.get("avg_stress") is not None
+
+            # One timestamp for every insight id, created_at and pattern row in this run
+            now = datetime.utcnow()
+            analyzers = [("sleep", partial(self._analyze_sleep_patterns, user_id, now, health_data, metrics_data))]
+            if len(series.schedule_rows) >= 2:
+                analyzers.append(("energy_windows", partial(self._analyze_energy_windows, user_id, now, series)))
+            if len(series.step_rows) >= 2:
+                analyzers.append(("activity", partial(self._analyze_activity_consistency, user_id, now, series)))
+            analyzers.append(("peak_performance", partial(self._analyze_peak_performance, user_id, now, series, metrics_data)))
+            # Check-in based analyzers
+            if mood_days >= 2:
+                analyzers.append(("mood", partial(self._analyze_mood_patterns, user_id, now, metrics_data)))
+            if energy_days >= 2:
+                analyzers.append(("checkin_energy", partial(self._analyze_checkin_energy_patterns, user_id, now, metrics_data, series)))
+            if stress_days >= 2:
+                analyzers.append(("stress", partial(self._analyze_stress_patterns, user_id, now, metrics_data)))
+
+            # The analyzers are pure CPU work; run them off the event loop
+            pattern_names = [name for name, _ in analyzers]
+            results = await asyncio.to_thread(self._run_analyzers, [analyze for _, analyze in analyzers])
 
             insights: List[HealthInsight] = []
+            patterns_to_store: List[Dict] = []
             for i, result in enumerate(results):
                 if isinstance(result, Exception):
                     logger.warning(f"[HealthInsights] Pattern {pattern_names[i]} failed: {result}")
                     continue
                 if result is None:
                     logger.info(f"[HealthInsights] Pattern {pattern_names[i]} returned None (insufficient data)")
-                elif result["confidence"] < 0.25:  # Lowered from 0.4 to show more insights
+                    continue
+                patterns_to_store.append(result["pattern"])
+                if result["confidence"] < 0.25:  # Lowered from 0.4 to show more insights
                     logger.info(f"[HealthInsights] Pattern {pattern_names[i]} confidence {result['confidence']:.2f} < 0.25, skipping")
                 else:
                     logger.info(f"[HealthInsights] Pattern {pattern_names[i]} generated with confidence {result['confidence']:.2f}")
                     insights.append(result["insight"])
 
-            pattern_order = {
-                PatternType.SLEEP_PATTERN: 0,
-                PatternType.ACTIVITY_CONSISTENCY: 1,
-                PatternType.ENERGY_WINDOWS: 2,
-                PatternType.MOOD_PATTERN: 3,
-                PatternType.CHECKIN_ENERGY_PATTERN: 4,
-                PatternType.STRESS_PATTERN: 5,
-                PatternType.PEAK_PERFORMANCE: 6,
-            }
-            insights.sort(key=lambda x: pattern_order.get(x.evidence.type, 99))
+            # Pattern rows are a write-through record; don't hold the response for them
+            if patterns_to_store:
+                task = asyncio.create_task(asyncio.to_thread(self._upsert_patterns, user_id, patterns_to_store))
+                self._bg_tasks.add(task)
+                task.add_done_callback(self._bg_tasks.discard)
+
+            insights.sort(key=lambda x: _PATTERN_ORDER.get(x.evidence.type, 99))
 
             has_risk = any(i.type == InsightType.RISK for i in insights)
-            count = len(insights)
-
-            if not insights:
-                coach_summary = None
-            elif count == 1 and has_risk:
-                coach_summary = "Went through your data from this week. One thing stood out that you should look at."
-            elif count == 1:
-                coach_summary = "Had a look at your week. Spotted something worth knowing about."
-            elif has_risk:
-                coach_summary = f"Checked your data from the past week. {count} patterns came up and a couple need your attention."
-            else:
-                coach_summary = f"Looked through your week. Found {count} things worth flagging, nothing mad though."
-
-            patterns = [
-                {
-                    "id": insight.id,
-                    "type": insight.type.value,
-                    "title": insight.title,
-                    "coach_commentary": insight.coach_commentary,
-                    "evidence": {
-                        "type": insight.evidence.type.value,
-                        "labels": insight.evidence.labels,
-                        "values": insight.evidence.values,
-                        "highlight_index": insight.evidence.highlight_index,
-                        "trend_direction": insight.evidence.trend_direction,
-                        "trend_value": insight.evidence.trend_value,
-                    },
-                    "action_text": insight.action_text,
-                    "action_steps": insight.action_steps,
-                    "is_new": insight.is_new,
-                    "created_at": insight.created_at.isoformat(),
-                }
-                for insight in insights
-            ]
+            coach_summary = _coach_summary(len(insights), has_risk)
 
-            return {
+            # orjson encodes the insight dataclasses (enums by value, datetimes as ISO 8601) directly
+            payload = orjson.dumps({
                 "coach_summary": coach_summary,
-                "patterns": patterns,
+                "patterns": insights,
                 "has_enough_data": True,
                 "days_until_enough_data": None,
-            }
+            })
+            self._store(user_id, generation, payload)
+            return payload
 
         except Exception as e:
             logger.error(f"Error generating health insights for user {user_id}: {e}")
-            return {
+            return orjson.dumps({
                 "coach_summary": None,
                 "patterns": [],
                 "has_enough_data": False,
                 "days_until_enough_data": MIN_DAYS_FOR_INSIGHTS,
-            }
+            })
 
     async def _fetch_user_health_data(self, user_id: str, days: int) -> List[Dict]:
-        """Fetch daily health data aggregated from health_metrics via database view."""
+        """Fetch daily health data aggregated from health_metrics server-side."""
+        start_date = _utc_start_date(days)
+        logger.info(f"[HealthInsights] Fetching data for user {user_id}, start_date={start_date}")
         try:
-            # Use UTC date to ensure consistency with stored timestamps
-            from datetime import timezone as tz
-            today_utc = datetime.now(tz.utc).date()
-            start_date = (today_utc - timedelta(days=days - 1)).isoformat()
-
-            logger.info(f"[HealthInsights] Fetching data for user {user_id}, start_date={start_date}")
+            # Single round-trip: daily rows aggregated in Postgres (046)
+            response = await asyncio.to_thread(
+                self.supabase.rpc("get_daily_health", {
+                    "p_user_id": user_id,
+                    "p_start_date": start_date,
+                }).execute
+            )
+            data = response.data or []
+            logger.info(f"[HealthInsights] get_daily_health returned {len(data)} rows")
+            return data
+        except Exception as e:
+            logger.warning(f"[HealthInsights] get_daily_health RPC failed, querying view: {e}")
+            return await self._fetch_health_view(user_id, start_date)
 
-            # Query the aggregation view with all fields including sleep times
-            response = (
+    async def _fetch_health_view(self, user_id: str, start_date: str) -> List[Dict]:
+        """Fallback when the RPC is unavailable: query the daily view, then raw metrics."""
+        try:
+            # Query the aggregation view for the fields the analyzers read
+            query = (
                 self.supabase.table("health_metrics_daily")
-                .select(
-                    "date,sleep_duration_hours,sleep_start_hour,sleep_end_hour,"
-                    "steps,active_energy,"
-                    "avg_heart_rate,resting_heart_rate,data_completeness"
-                )
+                .select("date,sleep_duration_hours,sleep_start_hour,sleep_end_hour,steps")
                 .eq("user_id", user_id)
                 .gte("date", start_date)
                 .order("date")
                 .limit(365)
-                .execute()
             )
+            response = await asyncio.to_thread(query.execute)
             data = response.data or []
 
             logger.info(f"[HealthInsights] View returned {len(data)} rows")
@@ -231,37 +339,29 @@ class HealthInsightsEngine:
                     logger.info(f"[HealthInsights] Sample sleep data: date={sample.get('date')}, duration={sample.get('sleep_duration_hours')}, start={sample.get('sleep_start_hour')}, end={sample.get('sleep_end_hour')}")
 
             if data:
-                # Add null fields for compatibility with pattern analysis methods
-                for row in data:
-                    row["hourly_activity"] = None
-                    row["active_minutes"] = None
-                    row["exercise_minutes"] = None
-                    row["sedentary_minutes"] = None
                 return data
 
             # Fallback: aggregate raw health_metrics if view query fails
             logger.info(f"[HealthInsights] View empty, falling back to direct aggregation")
-            return self._aggregate_health_metrics(user_id, start_date)
+            return await self._aggregate_health_metrics(user_id, start_date)
         except Exception as e:
             logger.error(f"Error fetching health data: {e}")
             # Fallback to direct aggregation
-            from datetime import timezone as tz
-            today_utc = datetime.now(tz.utc).date()
-            start_date = (today_utc - timedelta(days=days - 1)).isoformat()
-            return self._aggregate_health_metrics(user_id, start_date)
+            return await self._aggregate_health_metrics(user_id, start_date)
 
-    def _aggregate_health_metrics(self, user_id: str, start_date: str) -> List[Dict]:
+    async def _aggregate_health_metrics(self, user_id: str, start_date: str) -> List[Dict]:
         """Fallback aggregation when database view is not available."""
         try:
             logger.info(f"[HealthInsights] Aggregating raw health_metrics since {start_date}")
-            response = (
+            query = (
                 self.supabase.table("health_metrics")
                 .select("metric_type,value,recorded_at")
                 .eq("user_id", user_id)
+                .in_("metric_type", _AGGREGATED_METRIC_TYPES)
                 .gte("recorded_at", start_date)
                 .limit(5000)
-                .execute()
             )
+            response = await asyncio.to_thread(query.execute)
             rows = response.data or []
             logger.info(f"[HealthInsights] Raw health_metrics returned {len(rows)} rows")
             if not rows:
@@ -270,46 +370,37 @@ class HealthInsightsEngine:
             daily: Dict[str, Dict] = {}
             for row in rows:
                 metric_type = row.get("metric_type")
-                value = float(row.get("value") or 0)
                 recorded_at = row.get("recorded_at") or ""
                 day = recorded_at[:10]
                 if not day:
                     continue
-                daily.setdefault(
-                    day,
-                    {
+                value = float(row.get("value") or 0)
+                entry = daily.get(day)
+                if entry is None:
+                    entry = daily[day] = {
                         "date": day,
                         "sleep_duration_hours": None,
                         "sleep_start_hour": None,
                         "sleep_end_hour": None,
                         "steps": None,
                         "active_energy": None,
-                        "avg_heart_rate": None,
-                        "active_minutes": None,
-                        "exercise_minutes": None,
-                        "sedentary_minutes": None,
-                        "hourly_activity": None,
-                    },
-                )
+                    }
                 if metric_type == "sleep_duration":
-                    current = daily[day]["sleep_duration_hours"] or 0
-                    daily[day]["sleep_duration_hours"] = current + value
+                    entry["sleep_duration_hours"] = (entry["sleep_duration_hours"] or 0) + value
                 elif metric_type == "sleep_start":
                     # Take earliest bedtime (min value)
-                    current = daily[day]["sleep_start_hour"]
+                    current = entry["sleep_start_hour"]
                     if current is None or value < current:
-                        daily[day]["sleep_start_hour"] = value
+                        entry["sleep_start_hour"] = value
                 elif metric_type == "sleep_end":
                     # Take latest wake time (max value)
-                    current = daily[day]["sleep_end_hour"]
+                    current = entry["sleep_end_hour"]
                     if current is None or value > current:
-                        daily[day]["sleep_end_hour"] = value
+                        entry["sleep_end_hour"] = value
                 elif metric_type == "steps":
-                    current = daily[day]["steps"] or 0
-                    daily[day]["steps"] = current + int(value)
+                    entry["steps"] = (entry["steps"] or 0) + int(value)
                 elif metric_type == "active_energy":
-                    current = daily[day]["active_energy"] or 0
-                    daily[day]["active_energy"] = current + value
+                    entry["active_energy"] = (entry["active_energy"] or 0) + value
 
             aggregated = [daily[day] for day in sorted(daily.keys())]
             # Log aggregated data summary
@@ -321,15 +412,54 @@ class HealthInsightsEngine:
             logger.error(f"Error aggregating health_metrics: {e}")
             return []
 
-    def _count_days_with_data(self, health_data: List[Dict]) -> int:
+    def _run_analyzers(self, analyzers: List[Callable[[], Optional[Dict]]]) -> List:
+        """Run analyzers back to back, returning each result or the exception it raised."""
+        results = []
+        for analyze in analyzers:
+            try:
+                results.append(analyze())
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _health_series(self, health_data: List[Dict]) -> HealthSeries:
+        """Split health_data into the per-metric row sets the analyzers need in a single pass."""
         days = set()
+        by_date = {}
+        sleep_rows = []
+        sleep_by_date = {}
+        schedule_rows = []
+        step_rows = []
+        step_values = []
         for row in health_data:
-            if row.get("sleep_duration_hours") is not None or row.get("steps") is not None:
+            row_date = self._parse_date(row.get("date"))
+            if row_date:
+                by_date[row_date] = row
+            sleep = row.get("sleep_duration_hours")
+            steps = row.get("steps")
+            if sleep is not None or steps is not None:
                 days.add(row.get("date"))
-        return len(days)
+            if sleep is not None and float(sleep) > 0:
+                sleep_rows.append(row)
+                sleep_by_date[row.get("date")] = float(sleep)
+            if row.get("sleep_start_hour") is not None and row.get("sleep_end_hour") is not None:
+                schedule_rows.append(row)
+            if steps is not None and float(steps) > 0:
+                step_rows.append(row)
+                step_values.append(float(steps))
+        return HealthSeries(
+            rows=health_data,
+            by_date=by_date,
+            days_with_data=len(days),
+            sleep_rows=sleep_rows,
+            sleep_by_date=sleep_by_date,
+            schedule_rows=schedule_rows,
+            step_rows=step_rows,
+            step_values=step_values,
+        )
 
-    async def _analyze_sleep_patterns(
-        self, user_id: str, health_data: List[Dict], metrics_data: List[Dict] = None
+    def _analyze_sleep_patterns(
+        self, user_id: str, now: datetime, health_data: List[Dict], metrics_data: List[Dict] = None
     ) -> Optional[Dict]:
         # Build a merged dataset: start with health_data, fill zero-sleep days from check-in data
         checkin_sleep_by_date: Dict[str, float] = {}
@@ -365,8 +495,14 @@ class HealthInsightsEngine:
                 })
         merged_data.sort(key=lambda x: x.get("date", ""))
 
-        # Filter to rows with actual sleep values for analysis
-        sleep_rows = [r for r in merged_data if float(r.get("sleep_duration_hours") or 0) > 0]
+        # Filter to rows with actual sleep values for analysis, converting each value once
+        sleep_rows = []
+        sleep_values = []
+        for r in merged_data:
+            hours = float(r.get("sleep_duration_hours") or 0)
+            if hours > 0:
+                sleep_rows.append(r)
+                sleep_values.append(hours)
 
         logger.info(f"[SleepAnalysis] After merge: {len(merged_data)} total rows, {len(sleep_rows)} with sleep > 0")
 
@@ -374,9 +510,8 @@ class HealthInsightsEngine:
             logger.info(f"[SleepAnalysis] Not enough sleep data ({len(sleep_rows)} rows), skipping")
             return None
 
-        sleep_values = [float(r["sleep_duration_hours"]) for r in sleep_rows]
         avg_sleep = sum(sleep_values) / len(sleep_values)
-        sleep_std = pstdev(sleep_values) if len(sleep_values) > 1 else 0
+        sleep_std = _pstdev(sleep_values, avg_sleep) if len(sleep_values) > 1 else 0
 
         weekday_avg, weekend_avg = self._weekday_weekend_avgs(sleep_rows, "sleep_duration_hours")
 
@@ -387,9 +522,9 @@ class HealthInsightsEngine:
         logger.info(f"[SleepAnalysis] avg={avg_sleep:.1f}h, strength={pattern_strength:.2f}, confidence={confidence:.2f}, rows={len(sleep_rows)}")
 
         # Use merged data for the chart so check-in values appear instead of zeros
-        labels, values = self._last_7_days_series(merged_data, "sleep_duration_hours")
-
-        highlight_index = self._highlight_min_index(values)
+        labels, values, highlight_index = self._last_7_days_chart(
+            merged_data, "sleep_duration_hours", highlight="min"
+        )
 
         # Find worst night for specificity
         worst_value = min(sleep_values)
@@ -443,7 +578,7 @@ class HealthInsightsEngine:
         trend_value = f"{avg_sleep:.1f}h avg"
 
         insight = HealthInsight(
-            id=f"sleep-{user_id}-{datetime.utcnow().isoformat()}",
+            id=f"sleep-{user_id}-{now.isoformat()}",
             type=insight_type,
             title="Your Sleep Rhythm",
             coach_commentary=commentary,
@@ -457,12 +592,13 @@ class HealthInsightsEngine:
             ),
             action_text="Ask Coach",
             is_new=True,
-            created_at=datetime.utcnow(),
+            created_at=now,
             action_steps=action_steps,
         )
 
-        self._upsert_pattern(
+        pattern = self._pattern_row(
             user_id=user_id,
+            now=now,
             pattern_type=PatternType.SLEEP_PATTERN.value,
             confidence=confidence,
             pattern_data={
@@ -475,14 +611,11 @@ class HealthInsightsEngine:
             insight_title=insight.title,
         )
 
-        return {"insight": insight, "confidence": confidence}
+        return {"insight": insight, "confidence": confidence, "pattern": pattern}
 
-    async def _analyze_energy_windows(self, user_id: str, health_data: List[Dict]) -> Optional[Dict]:
+    def _analyze_energy_windows(self, user_id: str, now: datetime, series: HealthSeries) -> Optional[Dict]:
         """Analyze energy windows using sleep schedule (bedtime/wake time) data."""
-        sleep_rows = [
-            r for r in health_data
-            if r.get("sleep_start_hour") is not None and r.get("sleep_end_hour") is not None
-        ]
+        sleep_rows = series.schedule_rows
 
         if len(sleep_rows) < 2:  # Lowered from 4 to show energy insights sooner
             return None
@@ -501,8 +634,8 @@ class HealthInsightsEngine:
         is_morning_person = avg_bedtime_norm < 23 and avg_wake < 8
 
         # Pattern strength based on schedule consistency
-        bedtime_std = pstdev(normalized_bedtimes) if len(normalized_bedtimes) > 1 else 0
-        wake_std = pstdev(wake_times) if len(wake_times) > 1 else 0
+        bedtime_std = _pstdev(normalized_bedtimes, avg_bedtime_norm) if len(normalized_bedtimes) > 1 else 0
+        wake_std = _pstdev(wake_times, avg_wake) if len(wake_times) > 1 else 0
         consistency = max(0.0, 1.0 - (bedtime_std + wake_std) / 4.0)
         pattern_strength = max(0.3, consistency)
         confidence = self._confidence(len(sleep_rows), pattern_strength)
@@ -548,37 +681,21 @@ class HealthInsightsEngine:
                 "Use the hour after lunch for routine work, not deep thinking",
             ]
 
-        # Build chart: last 7 days showing bedtime and wake time
-        labels = []
-        bedtime_values = []
+        # Build chart: wake time over the last 7 days of schedule data, read
+        # from the date map shared with the other analyzers
+        last_date = self._parse_date(sleep_rows[-1].get("date")) or date.today()
+        series_dates, day_labels = _last_7_days(last_date.toordinal())
+        labels = list(day_labels)
         wake_values = []
-        if sleep_rows:
-            last_date = self._parse_date(sleep_rows[-1].get("date")) or date.today()
-        else:
-            last_date = date.today()
-
-        data_map = {}
-        for r in sleep_rows:
-            d = self._parse_date(r.get("date"))
-            if d:
-                data_map[d] = r
-
-        for delta in reversed(range(7)):
-            d = last_date - timedelta(days=delta)
-            labels.append(d.strftime("%a"))
-            row = data_map.get(d)
-            if row:
-                # Normalize bedtime for chart (show as hours past noon for visual clarity)
-                bt = float(row.get("sleep_start_hour", 0))
-                wt = float(row.get("sleep_end_hour", 0))
-                bedtime_values.append(round(bt, 1))
-                wake_values.append(round(wt, 1))
+        for d in series_dates:
+            row = series.by_date.get(d)
+            if row and row.get("sleep_start_hour") is not None and row.get("sleep_end_hour") is not None:
+                wake_values.append(round(float(row["sleep_end_hour"]), 1))
             else:
-                bedtime_values.append(0)
                 wake_values.append(0)
 
         insight = HealthInsight(
-            id=f"energy-{user_id}-{datetime.utcnow().isoformat()}",
+            id=f"energy-{user_id}-{now.isoformat()}",
             type=insight_type,
             title="Your Energy Pattern",
             coach_commentary=commentary,
@@ -592,12 +709,13 @@ class HealthInsightsEngine:
             ),
             action_text="Ask Coach",
             is_new=True,
-            created_at=datetime.utcnow(),
+            created_at=now,
             action_steps=action_steps,
         )
 
-        self._upsert_pattern(
+        pattern = self._pattern_row(
             user_id=user_id,
+            now=now,
             pattern_type=PatternType.ENERGY_WINDOWS.value,
             confidence=confidence,
             pattern_data={
@@ -610,21 +728,21 @@ class HealthInsightsEngine:
             insight_title=insight.title,
         )
 
-        return {"insight": insight, "confidence": confidence}
+        return {"insight": insight, "confidence": confidence, "pattern": pattern}
 
-    async def _analyze_activity_consistency(
-        self, user_id: str, health_data: List[Dict]
+    def _analyze_activity_consistency(
+        self, user_id: str, now: datetime, series: HealthSeries
     ) -> Optional[Dict]:
-        step_rows = [r for r in health_data if r.get("steps") is not None and float(r["steps"]) > 0]
+        step_rows = series.step_rows
         if len(step_rows) < 2:  # Lowered from 4 to show activity insights sooner
             return None
 
-        step_values = [float(r["steps"]) for r in step_rows]
+        step_values = series.step_values
         avg_steps = sum(step_values) / len(step_values)
         if avg_steps <= 0:
             return None
 
-        step_std = pstdev(step_values) if len(step_values) > 1 else 0
+        step_std = _pstdev(step_values, avg_steps) if len(step_values) > 1 else 0
         cv = step_std / avg_steps if avg_steps else 0
         max_steps = max(step_values)
         min_steps = min(step_values)
@@ -642,8 +760,9 @@ class HealthInsightsEngine:
         pattern_strength = max(0.5, min(1.0, cv / 0.5)) if cv >= 0.3 else max(0.5, 1.0 - cv)
         confidence = self._confidence(len(step_rows), pattern_strength)
 
-        labels, values = self._last_7_days_series(health_data, "steps")
-        highlight_index = self._highlight_max_index(values)
+        labels, values, highlight_index = self._last_7_days_chart(
+            series.rows, "steps", highlight="max", by_date=series.by_date
+        )
 
         if cv >= 0.6:
             day_context = ""
@@ -682,7 +801,7 @@ class HealthInsightsEngine:
             ]
 
         insight = HealthInsight(
-            id=f"activity-{user_id}-{datetime.utcnow().isoformat()}",
+            id=f"activity-{user_id}-{now.isoformat()}",
             type=insight_type,
             title="Movement Patterns",
             coach_commentary=commentary,
@@ -696,12 +815,13 @@ class HealthInsightsEngine:
             ),
             action_text="Ask Coach",
             is_new=True,
-            created_at=datetime.utcnow(),
+            created_at=now,
             action_steps=action_steps,
         )
 
-        self._upsert_pattern(
+        pattern = self._pattern_row(
             user_id=user_id,
+            now=now,
             pattern_type=PatternType.ACTIVITY_CONSISTENCY.value,
             confidence=confidence,
             pattern_data={
@@ -713,10 +833,10 @@ class HealthInsightsEngine:
             insight_title=insight.title,
         )
 
-        return {"insight": insight, "confidence": confidence}
+        return {"insight": insight, "confidence": confidence, "pattern": pattern}
 
-    async def _analyze_peak_performance(
-        self, user_id: str, health_data: List[Dict], metrics_data: List[Dict]
+    def _analyze_peak_performance(
+        self, user_id: str, now: datetime, series: HealthSeries, metrics_data: List[Dict]
     ) -> Optional[Dict]:
         """Analyze when the user performs best by cross-correlating energy, mood,
         stress, sleep, and activity across days of the week.
@@ -724,30 +844,28 @@ class HealthInsightsEngine:
         Builds a composite 'performance score' per day and surfaces the peak day(s)
         so the user can schedule demanding work accordingly.
         """
-        DOW_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
-
         # Collect per-day-of-week scores from all available signals
         # Each signal contributes a 0-1 normalised score per weekday
         dow_scores: Dict[int, List[float]] = {i: [] for i in range(7)}
         signals_used: List[str] = []
 
         # --- Activity (steps): higher = better ---
-        step_rows = [r for r in health_data if r.get("steps") and float(r["steps"]) > 0]
+        step_rows = series.step_rows
         if len(step_rows) >= 3:
             step_dow = self._day_of_week_avgs(step_rows, "steps")
             max_steps = max(step_dow.values()) if step_dow else 1
             for day_name, avg in step_dow.items():
-                idx = DOW_NAMES.index(day_name) if day_name in DOW_NAMES else -1
+                idx = _WEEKDAY_INDEX.get(day_name, -1)
                 if idx >= 0 and max_steps > 0:
                     dow_scores[idx].append(avg / max_steps)
             signals_used.append("activity")
 
         # --- Sleep quality: closer to 7-9h = better ---
-        sleep_rows = [r for r in health_data if r.get("sleep_duration_hours") and float(r["sleep_duration_hours"]) > 0]
+        sleep_rows = series.sleep_rows
         if len(sleep_rows) >= 3:
             sleep_dow = self._day_of_week_avgs(sleep_rows, "sleep_duration_hours")
             for day_name, avg in sleep_dow.items():
-                idx = DOW_NAMES.index(day_name) if day_name in DOW_NAMES else -1
+                idx = _WEEKDAY_INDEX.get(day_name, -1)
                 if idx >= 0:
                     # Score: 1.0 when avg is 8h, dropping toward 0 at 4h or 12h
                     score = max(0.0, 1.0 - abs(avg - 8.0) / 4.0)
@@ -759,7 +877,7 @@ class HealthInsightsEngine:
         if len(energy_rows) >= 3:
             energy_dow = self._day_of_week_avgs(energy_rows, "avg_energy")
             for day_name, avg in energy_dow.items():
-                idx = DOW_NAMES.index(day_name) if day_name in DOW_NAMES else -1
+                idx = _WEEKDAY_INDEX.get(day_name, -1)
                 if idx >= 0:
                     dow_scores[idx].append(avg / 5.0)
             signals_used.append("energy")
@@ -769,7 +887,7 @@ class HealthInsightsEngine:
         if len(mood_rows) >= 3:
             mood_dow = self._day_of_week_avgs(mood_rows, "avg_mood")
             for day_name, avg in mood_dow.items():
-                idx = DOW_NAMES.index(day_name) if day_name in DOW_NAMES else -1
+                idx = _WEEKDAY_INDEX.get(day_name, -1)
                 if idx >= 0:
                     dow_scores[idx].append(avg / 5.0)
             signals_used.append("mood")
@@ -779,7 +897,7 @@ class HealthInsightsEngine:
         if len(stress_rows) >= 3:
             stress_dow = self._day_of_week_avgs(stress_rows, "avg_stress")
             for day_name, avg in stress_dow.items():
-                idx = DOW_NAMES.index(day_name) if day_name in DOW_NAMES else -1
+                idx = _WEEKDAY_INDEX.get(day_name, -1)
                 if idx >= 0:
                     dow_scores[idx].append(1.0 - avg / 5.0)  # invert: low stress = high score
             signals_used.append("stress")
@@ -801,8 +919,8 @@ class HealthInsightsEngine:
         # Find peak and trough
         peak_dow = max(composite, key=composite.get)
         trough_dow = min(composite, key=composite.get)
-        peak_name = DOW_NAMES[peak_dow]
-        trough_name = DOW_NAMES[trough_dow]
+        peak_name = _WEEKDAY_LABELS[peak_dow]
+        trough_name = _WEEKDAY_LABELS[trough_dow]
         peak_score = composite[peak_dow]
         trough_score = composite[trough_dow]
         spread = peak_score - trough_score
@@ -816,29 +934,27 @@ class HealthInsightsEngine:
         confidence = self._confidence(sample_size, pattern_strength)
 
         # Build chart values in Mon-Sun order
-        labels = DOW_NAMES
+        labels = list(_WEEKDAY_LABELS)
         values = [round(composite.get(i, 0), 1) for i in range(7)]
         highlight_index = peak_dow
 
         # Find second-best day for richer commentary
         sorted_days = sorted(composite.items(), key=lambda x: x[1], reverse=True)
-        runner_up_name = DOW_NAMES[sorted_days[1][0]] if len(sorted_days) > 1 else None
+        runner_up_name = _WEEKDAY_LABELS[sorted_days[1][0]] if len(sorted_days) > 1 else None
 
         # What makes the peak day special?
         peak_drivers = []
+        # Reuse the day-of-week averages computed for the composite above
         if "energy" in signals_used:
-            energy_dow_map = self._day_of_week_avgs(energy_rows, "avg_energy")
-            peak_energy = energy_dow_map.get(peak_name)
+            peak_energy = energy_dow.get(peak_name)
             if peak_energy:
                 peak_drivers.append(f"energy hits {peak_energy:.1f}/5")
         if "activity" in signals_used:
-            step_dow_map = self._day_of_week_avgs(step_rows, "steps")
-            peak_steps = step_dow_map.get(peak_name)
+            peak_steps = step_dow.get(peak_name)
             if peak_steps:
                 peak_drivers.append(f"{int(peak_steps):,} steps")
         if "mood" in signals_used:
-            mood_dow_map = self._day_of_week_avgs(mood_rows, "avg_mood")
-            peak_mood = mood_dow_map.get(peak_name)
+            peak_mood = mood_dow.get(peak_name)
             if peak_mood:
                 peak_drivers.append(f"mood at {peak_mood:.1f}/5")
 
@@ -884,7 +1000,7 @@ class HealthInsightsEngine:
         trend_value = f"{peak_name} {peak_score:.0f}/100"
 
         insight = HealthInsight(
-            id=f"peak-perf-{user_id}-{datetime.utcnow().isoformat()}",
+            id=f"peak-perf-{user_id}-{now.isoformat()}",
             type=insight_type,
             title="Peak Performance",
             coach_commentary=commentary,
@@ -898,12 +1014,13 @@ class HealthInsightsEngine:
             ),
             action_text="Ask Coach",
             is_new=True,
-            created_at=datetime.utcnow(),
+            created_at=now,
             action_steps=action_steps,
         )
 
-        self._upsert_pattern(
+        pattern = self._pattern_row(
             user_id=user_id,
+            now=now,
             pattern_type=PatternType.PEAK_PERFORMANCE.value,
             confidence=confidence,
             pattern_data={
@@ -913,116 +1030,117 @@ class HealthInsightsEngine:
                 "trough_score": round(trough_score, 1),
                 "spread": round(spread, 1),
                 "signals_used": signals_used,
-                "composite_scores": {DOW_NAMES[k]: round(v, 1) for k, v in composite.items()},
+                "composite_scores": {_WEEKDAY_LABELS[k]: round(v, 1) for k, v in composite.items()},
             },
             insight_title=insight.title,
         )
 
-        return {"insight": insight, "confidence": confidence}
+        return {"insight": insight, "confidence": confidence, "pattern": pattern}
 
     def _confidence(self, sample_size: int, pattern_strength: float) -> float:
         # Use MIN_DAYS_FOR_INSIGHTS as denominator so 7 days of data = 1.0 sample factor
         sample_factor = min(1.0, sample_size / MIN_DAYS_FOR_INSIGHTS)
         return min(1.0, sample_factor * pattern_strength)
 
-    def _upsert_pattern(
+    def _pattern_row(
         self,
         user_id: str,
+        now: datetime,
         pattern_type: str,
         confidence: float,
         pattern_data: Dict,
         insight_title: Optional[str] = None,
-    ) -> None:
+    ) -> Dict:
+        """Build a user_health_patterns row; persisted in one batch by _upsert_patterns."""
+        return {
+            "row": {
+                "user_id": user_id,
+                "pattern_type": pattern_type,
+                "confidence_score": round(confidence, 2),
+                "pattern_data": pattern_data,
+                "calculated_at": now.isoformat(),
+                "valid_until": (now + timedelta(days=7)).isoformat(),
+            },
+            "insight_title": insight_title,
+        }
+
+    def _upsert_patterns(self, user_id: str, patterns: List[Dict]) -> None:
+        """Persist all patterns from one insights run with a single upsert."""
+        if not patterns:
+            return
         try:
-            # Check if this is a new pattern (not seen before)
+            rows = [p["row"] for p in patterns]
+
+            # Check which patterns are new (not seen before)
             existing = self.supabase.table("user_health_patterns").select(
-                "id, confidence_score"
-            ).eq("user_id", user_id).eq("pattern_type", pattern_type).execute()
-
-            is_new_pattern = not existing.data or len(existing.data) == 0
-
-            # Upsert the pattern
-            result = self.supabase.table("user_health_patterns").upsert(
-                {
-                    "user_id": user_id,
-                    "pattern_type": pattern_type,
-                    "confidence_score": round(confidence, 2),
-                    "pattern_data": pattern_data,
-                    "calculated_at": datetime.utcnow().isoformat(),
-                    "valid_until": (datetime.utcnow() + timedelta(days=7)).isoformat(),
-                },
-                on_conflict="user_id,pattern_type",
+                "pattern_type"
+            ).eq("user_id", user_id).in_(
+                "pattern_type", [row["pattern_type"] for row in rows]
+            ).execute()
+            existing_types = {r["pattern_type"] for r in existing.data or []}
+
+            self.supabase.table("user_health_patterns").upsert(
+                rows, on_conflict="user_id,pattern_type"
             ).execute()
 
             # Log new patterns with high confidence (notifications handled separately)
-            if is_new_pattern and confidence >= 0.6 and insight_title:
-                logger.info(f"New insight discovered for {user_id}: {pattern_type} - {insight_title}")
+            for p in patterns:
+                row = p["row"]
+                if (
+                    row["pattern_type"] not in existing_types
+                    and row["confidence_score"] >= 0.6
+                    and p["insight_title"]
+                ):
+                    logger.info(f"New insight discovered for {user_id}: {row['pattern_type']} - {p['insight_title']}")
 
         except Exception as e:
-            logger.warning(f"Failed to upsert health pattern: {e}")
+            logger.warning(f"Failed to upsert health patterns: {e}")
 
     def _weekday_weekend_avgs(
         self, rows: List[Dict], field: str
     ) -> Tuple[Optional[float], Optional[float]]:
-        weekday_vals = []
-        weekend_vals = []
-        for row in rows:
-            value = row.get(field)
-            if value is None:
-                continue
-            row_date = self._parse_date(row.get("date"))
-            if not row_date:
-                continue
-            if row_date.weekday() >= 5:
-                weekend_vals.append(float(value))
-            else:
-                weekday_vals.append(float(value))
-
-        weekday_avg = (
-            sum(weekday_vals) / len(weekday_vals) if weekday_vals else None
-        )
-        weekend_avg = (
-            sum(weekend_vals) / len(weekend_vals) if weekend_vals else None
-        )
+        _, weekday_avg, weekend_avg = self._day_of_week_stats(rows, field)
         return weekday_avg, weekend_avg
 
-    def _last_7_days_series(
-        self, rows: List[Dict], field: str
-    ) -> Tuple[List[str], List[float]]:
+    def _last_7_days_chart(
+        self,
+        rows: List[Dict],
+        field: str,
+        highlight: Optional[str] = None,
+        by_date: Optional[Dict[date, Dict]] = None,
+    ) -> Tuple[List[str], List[float], Optional[int]]:
+        """Chart labels and values for the last 7 days, plus the index to highlight.
+
+        highlight="min" picks the lowest non-zero day, "max" the highest day.
+        Pass by_date when the rows are already keyed by parsed date.
+        """
         # Always anchor to today so the chart shows the most recent 7 days
-        last_date = date.today()
-
-        series_dates = [
-            last_date - timedelta(days=delta) for delta in reversed(range(7))
-        ]
-        data_map = {
-            self._parse_date(r.get("date")): r.get(field) for r in rows
-        }
-        labels = [d.strftime("%a") for d in series_dates]
-        values = [
-            round(float(data_map.get(d, 0) or 0), 2) for d in series_dates
-        ]
-        return labels, values
-
-    def _highlight_min_index(self, values: List[float]) -> Optional[int]:
-        non_zero = [v for v in values if v > 0]
-        if not non_zero:
-            return None
-        min_value = min(non_zero)
-        return values.index(min_value)
-
-    def _highlight_max_index(self, values: List[float]) -> Optional[int]:
-        if not values:
-            return None
-        return int(values.index(max(values)))
+        series_dates, labels = _last_7_days(date.today().toordinal())
+        if by_date is None:
+            by_date = {self._parse_date(r.get("date")): r for r in rows}
+        values = []
+        highlight_index = None
+        best = None
+        for i, d in enumerate(series_dates):
+            row = by_date.get(d)
+            value = round(float((row.get(field) if row else 0) or 0), 2)
+            values.append(value)
+            if highlight == "max":
+                if best is None or value > best:
+                    best, highlight_index = value, i
+            elif highlight == "min" and value > 0:
+                if best is None or value < best:
+                    best, highlight_index = value, i
+        return list(labels), values, highlight_index
 
     def _peak_window(self, values: List[float], window: int) -> Tuple[int, float]:
         best_start = 0
         best_sum = -1
+        total = sum(values[i % 24] for i in range(window))
         for start in range(24):
-            total = 0
-            for i in range(window):
-                total += values[(start + i) % 24]
+            if start:
+                # Slide the circular window: add the hour entering, drop the hour leaving
+                total += values[(start + window - 1) % 24] - values[start - 1]
             if total > best_sum:
                 best_sum = total
                 best_start = start
@@ -1033,20 +1151,14 @@ class HealthInsightsEngine:
         return f"{self._hour_label(start_hour)} to {self._hour_label(end_hour)}"
 
     def _hour_label(self, hour: int) -> str:
-        suffix = "am" if hour < 12 else "pm"
-        hour12 = hour % 12
-        hour12 = 12 if hour12 == 0 else hour12
-        return f"{hour12}{suffix}"
+        return _HOUR_LABELS[hour % 24]
 
     def _parse_date(self, value: Optional[str]) -> Optional[date]:
         if not value:
             return None
         if isinstance(value, date):
             return value
-        try:
-            return datetime.strptime(value, "%Y-%m-%d").date()
-        except Exception:
-            return None
+        return _parse_date_str(value)
 
     # =========================================================================
     # Check-in Data Methods (mood, energy, stress from user_metrics table)
@@ -1055,21 +1167,19 @@ class HealthInsightsEngine:
     async def _fetch_user_metrics_data(self, user_id: str, days: int) -> List[Dict]:
         """Fetch daily check-in data (mood, energy, stress, sleep) from user_metrics table."""
         try:
-            from datetime import timezone as tz
-            today_utc = datetime.now(tz.utc).date()
-            start_date = (today_utc - timedelta(days=days - 1)).isoformat()
+            start_date = _utc_start_date(days)
 
             logger.info(f"[HealthInsights] Fetching user_metrics for user {user_id}, start_date={start_date}")
 
-            response = (
+            query = (
                 self.supabase.table("user_metrics")
                 .select("metric_type,value,logged_at,context")
                 .eq("user_id", user_id)
                 .in_("metric_type", ["mood", "energy", "stress", "sleep"])
                 .gte("logged_at", start_date)
                 .order("logged_at")
-                .execute()
             )
+            response = await asyncio.to_thread(query.execute)
 
             rows = response.data or []
             logger.info(f"[HealthInsights] user_metrics returned {len(rows)} rows")
@@ -1141,8 +1251,15 @@ class HealthInsightsEngine:
 
     def _day_of_week_avgs(self, rows: List[Dict], field: str) -> Dict[str, float]:
         """Calculate average for each day of the week."""
-        dow_names = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+        return self._day_of_week_stats(rows, field)[0]
+
+    def _day_of_week_stats(
+        self, rows: List[Dict], field: str
+    ) -> Tuple[Dict[str, float], Optional[float], Optional[float]]:
+        """Per-weekday averages plus weekday (Mon-Fri) and weekend averages in one pass."""
         dow_values: Dict[int, List[float]] = {i: [] for i in range(7)}
+        weekday_total = weekend_total = 0.0
+        weekday_count = weekend_count = 0
 
         for row in rows:
             value = row.get(field)
@@ -1151,13 +1268,23 @@ class HealthInsightsEngine:
             row_date = self._parse_date(row.get("date"))
             if not row_date:
                 continue
-            dow_values[row_date.weekday()].append(float(value))
+            value = float(value)
+            dow = row_date.weekday()
+            dow_values[dow].append(value)
+            if dow >= 5:
+                weekend_total += value
+                weekend_count += 1
+            else:
+                weekday_total += value
+                weekday_count += 1
 
         result = {}
         for dow, values in dow_values.items():
             if values:
-                result[dow_names[dow]] = sum(values) / len(values)
-        return result
+                result[_WEEKDAY_LABELS[dow]] = sum(values) / len(values)
+        weekday_avg = weekday_total / weekday_count if weekday_count else None
+        weekend_avg = weekend_total / weekend_count if weekend_count else None
+        return result, weekday_avg, weekend_avg
 
     def _calculate_trend(self, values: List[float]) -> float:
         """Calculate trend as difference between last third and first third of values."""
@@ -1168,16 +1295,11 @@ class HealthInsightsEngine:
         last_avg = sum(values[-third:]) / third
         return last_avg - first_avg
 
-    def _correlate_with_sleep(self, energy_rows: List[Dict], health_data: List[Dict]) -> Optional[float]:
+    def _correlate_with_sleep(self, energy_rows: List[Dict], sleep_by_date: Dict[str, float]) -> Optional[float]:
         """Get average sleep hours for days where we have energy data."""
-        if not health_data:
+        if not sleep_by_date:
             return None
 
-        sleep_by_date = {}
-        for row in health_data:
-            if row.get("sleep_duration_hours"):
-                sleep_by_date[row.get("date")] = float(row["sleep_duration_hours"])
-
         # Get sleep values for dates where we have energy data
         matching_sleep = []
         for energy_row in energy_rows:
@@ -1191,7 +1313,7 @@ class HealthInsightsEngine:
     # Check-in Pattern Analyzers
     # =========================================================================
 
-    async def _analyze_mood_patterns(self, user_id: str, metrics_data: List[Dict]) -> Optional[Dict]:
+    def _analyze_mood_patterns(self, user_id: str, now: datetime, metrics_data: List[Dict]) -> Optional[Dict]:
         """Analyze mood patterns from check-in data."""
         mood_rows = [r for r in metrics_data if r.get("avg_mood") is not None]
         if len(mood_rows) < 2:
@@ -1199,13 +1321,12 @@ class HealthInsightsEngine:
 
         mood_values = [float(r["avg_mood"]) for r in mood_rows]
         avg_mood = sum(mood_values) / len(mood_values)
-        mood_std = pstdev(mood_values) if len(mood_values) > 1 else 0
+        mood_std = _pstdev(mood_values, avg_mood) if len(mood_values) > 1 else 0
 
-        # Analyze weekday vs weekend mood
-        weekday_avg, weekend_avg = self._weekday_weekend_avgs(mood_rows, "avg_mood")
+        # Analyze weekday vs weekend mood and day-of-week patterns in one pass
+        dow_avgs, weekday_avg, weekend_avg = self._day_of_week_stats(mood_rows, "avg_mood")
 
-        # Analyze day-of-week patterns (find low days)
-        dow_avgs = self._day_of_week_avgs(mood_rows, "avg_mood")
+        # Find low days
         worst_day, worst_avg = min(dow_avgs.items(), key=lambda x: x[1]) if dow_avgs else (None, None)
         best_day, best_avg = max(dow_avgs.items(), key=lambda x: x[1]) if dow_avgs else (None, None)
 
@@ -1215,8 +1336,7 @@ class HealthInsightsEngine:
         pattern_strength = min(1.0, mood_std / 1.0)  # Higher variance = stronger pattern
         confidence = self._confidence(len(mood_rows), max(0.3, pattern_strength))
 
-        labels, values = self._last_7_days_series(mood_rows, "avg_mood")
-        highlight_index = self._highlight_min_index(values)
+        labels, values, highlight_index = self._last_7_days_chart(mood_rows, "avg_mood", highlight="min")
 
         # Generate insight based on patterns
         if avg_mood < 2.5:
@@ -1255,7 +1375,7 @@ class HealthInsightsEngine:
         trend_value = f"{avg_mood:.1f}/5 avg"
 
         insight = HealthInsight(
-            id=f"mood-{user_id}-{datetime.utcnow().isoformat()}",
+            id=f"mood-{user_id}-{now.isoformat()}",
             type=insight_type,
             title="Your Mood Pattern",
             coach_commentary=commentary,
@@ -1269,12 +1389,13 @@ class HealthInsightsEngine:
             ),
             action_text="Ask Coach",
             is_new=True,
-            created_at=datetime.utcnow(),
+            created_at=now,
             action_steps=action_steps,
         )
 
-        self._upsert_pattern(
+        pattern = self._pattern_row(
             user_id=user_id,
+            now=now,
             pattern_type=PatternType.MOOD_PATTERN.value,
             confidence=confidence,
             pattern_data={
@@ -1288,10 +1409,10 @@ class HealthInsightsEngine:
             insight_title=insight.title,
         )
 
-        return {"insight": insight, "confidence": confidence}
+        return {"insight": insight, "confidence": confidence, "pattern": pattern}
 
-    async def _analyze_checkin_energy_patterns(
-        self, user_id: str, metrics_data: List[Dict], health_data: List[Dict]
+    def _analyze_checkin_energy_patterns(
+        self, user_id: str, now: datetime, metrics_data: List[Dict], series: HealthSeries
     ) -> Optional[Dict]:
         """Analyze energy patterns from check-ins, correlating with sleep when available."""
         energy_rows = [r for r in metrics_data if r.get("avg_energy") is not None]
@@ -1300,10 +1421,10 @@ class HealthInsightsEngine:
 
         energy_values = [float(r["avg_energy"]) for r in energy_rows]
         avg_energy = sum(energy_values) / len(energy_values)
-        energy_std = pstdev(energy_values) if len(energy_values) > 1 else 0
+        energy_std = _pstdev(energy_values, avg_energy) if len(energy_values) > 1 else 0
 
         # Build sleep correlation if we have matching health data
-        sleep_correlation = self._correlate_with_sleep(energy_rows, health_data)
+        sleep_correlation = self._correlate_with_sleep(energy_rows, series.sleep_by_date)
 
         # Analyze day-of-week patterns
         dow_avgs = self._day_of_week_avgs(energy_rows, "avg_energy")
@@ -1315,8 +1436,7 @@ class HealthInsightsEngine:
         pattern_strength = min(1.0, energy_std / 1.0)
         confidence = self._confidence(len(energy_rows), max(0.3, pattern_strength))
 
-        labels, values = self._last_7_days_series(energy_rows, "avg_energy")
-        highlight_index = self._highlight_min_index(values)
+        labels, values, highlight_index = self._last_7_days_chart(energy_rows, "avg_energy", highlight="min")
 
         # Generate insight based on patterns
         if avg_energy < 2.5:
@@ -1363,7 +1483,7 @@ class HealthInsightsEngine:
         trend_value = f"{avg_energy:.1f}/5 avg"
 
         insight = HealthInsight(
-            id=f"checkin-energy-{user_id}-{datetime.utcnow().isoformat()}",
+            id=f"checkin-energy-{user_id}-{now.isoformat()}",
             type=insight_type,
             title="Your Energy Levels",
             coach_commentary=commentary,
@@ -1377,12 +1497,13 @@ class HealthInsightsEngine:
             ),
             action_text="Ask Coach",
             is_new=True,
-            created_at=datetime.utcnow(),
+            created_at=now,
             action_steps=action_steps,
         )
 
-        self._upsert_pattern(
+        pattern = self._pattern_row(
             user_id=user_id,
+            now=now,
             pattern_type=PatternType.CHECKIN_ENERGY_PATTERN.value,
             confidence=confidence,
             pattern_data={
@@ -1396,9 +1517,9 @@ class HealthInsightsEngine:
             insight_title=insight.title,
         )
 
-        return {"insight": insight, "confidence": confidence}
+        return {"insight": insight, "confidence": confidence, "pattern": pattern}
 
-    async def _analyze_stress_patterns(self, user_id: str, metrics_data: List[Dict]) -> Optional[Dict]:
+    def _analyze_stress_patterns(self, user_id: str, now: datetime, metrics_data: List[Dict]) -> Optional[Dict]:
         """Analyze stress patterns from check-in data."""
         stress_rows = [r for r in metrics_data if r.get("avg_stress") is not None]
         if len(stress_rows) < 2:
@@ -1406,13 +1527,12 @@ class HealthInsightsEngine:
 
         stress_values = [float(r["avg_stress"]) for r in stress_rows]
         avg_stress = sum(stress_values) / len(stress_values)
-        stress_std = pstdev(stress_values) if len(stress_values) > 1 else 0
+        stress_std = _pstdev(stress_values, avg_stress) if len(stress_values) > 1 else 0
 
-        # Analyze weekday vs weekend stress
-        weekday_avg, weekend_avg = self._weekday_weekend_avgs(stress_rows, "avg_stress")
+        # Analyze weekday vs weekend stress and day-of-week patterns in one pass
+        dow_avgs, weekday_avg, weekend_avg = self._day_of_week_stats(stress_rows, "avg_stress")
 
-        # Analyze day-of-week patterns (find high stress days)
-        dow_avgs = self._day_of_week_avgs(stress_rows, "avg_stress")
+        # Find high stress days
         worst_day, worst_avg = max(dow_avgs.items(), key=lambda x: x[1]) if dow_avgs else (None, None)
         best_day, best_avg = min(dow_avgs.items(), key=lambda x: x[1]) if dow_avgs else (None, None)
 
@@ -1421,8 +1541,8 @@ class HealthInsightsEngine:
         pattern_strength = min(1.0, avg_stress / 3.0)  # Higher stress = stronger pattern
         confidence = self._confidence(len(stress_rows), max(0.3, pattern_strength))
 
-        labels, values = self._last_7_days_series(stress_rows, "avg_stress")
-        highlight_index = self._highlight_max_index(values)  # Highlight highest stress day
+        # Highlight highest stress day
+        labels, values, highlight_index = self._last_7_days_chart(stress_rows, "avg_stress", highlight="max")
 
         # Generate insight based on patterns
         if avg_stress > 3.5:
@@ -1469,7 +1589,7 @@ class HealthInsightsEngine:
         trend_value = f"{avg_stress:.1f}/5 avg"
 
         insight = HealthInsight(
-            id=f"stress-{user_id}-{datetime.utcnow().isoformat()}",
+            id=f"stress-{user_id}-{now.isoformat()}",
             type=insight_type,
             title="Your Stress Levels",
             coach_commentary=commentary,
@@ -1483,12 +1603,13 @@ class HealthInsightsEngine:
             ),
             action_text="Ask Coach",
             is_new=True,
-            created_at=datetime.utcnow(),
+            created_at=now,
             action_steps=action_steps,
         )
 
-        self._upsert_pattern(
+        pattern = self._pattern_row(
             user_id=user_id,
+            now=now,
             pattern_type=PatternType.STRESS_PATTERN.value,
             confidence=confidence,
             pattern_data={
@@ -1502,7 +1623,7 @@ class HealthInsightsEngine:
             insight_title=insight.title,
         )
 
-        return {"insight": insight, "confidence": confidence}
+        return {"insight": insight, "confidence": confidence, "pattern": pattern}
 
 
 health_insights_engine = HealthInsightsEngine()
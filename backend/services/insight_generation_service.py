@@ -9,6 +9,7 @@ Optimizations:
 """
 
 import asyncio
+import heapq
 import logging
 from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional
@@ -99,12 +100,12 @@ class InsightGenerationService:
             logger.error(f"Error in parallel insight generation: {e}")
             insights = []
         
-        # Sort by priority
-        insights.sort(key=lambda x: x.priority, reverse=True)
+        # Top 10 by priority (partial selection, no full sort)
+        top_insights = heapq.nlargest(10, insights, key=lambda x: x.priority)
         
-        # Convert to dict format (limit to top 10)
+        # Convert to dict format
         insights_dict = []
-        for insight in insights[:10]:
+        for insight in top_insights:
             insights_dict.append({
                 'title': insight.title,
                 'body': insight.body,
@@ -73,7 +73,7 @@ class NudgeService:
 
         # Hash user_id + week to get a stable per-user-per-week seed
         seed_str = f"{user_id}:{week_number}:{now.year}"
-        seed = int(hashlib.sha256(seed_str.encode()).hexdigest()[:8], 16)
+        seed = int(hashlib.blake2b(seed_str.encode(), digest_size=4).hexdigest(), 16)
 
         rng = random.Random(seed)
 
@@ -183,7 +183,7 @@ class NudgeService:
         """Pick a message based on context, with variety via seeded random."""
         # Seed with user_id + date for daily variety but reproducibility
         today = datetime.now(timezone.utc).date().isoformat()
-        seed = int(hashlib.sha256(f"{user_id}:{today}:nudge".encode()).hexdigest()[:8], 16)
+        seed = int(hashlib.blake2b(f"{user_id}:{today}:nudge".encode(), digest_size=4).hexdigest(), 16)
         rng = random.Random(seed)
 
         days_absent = context.get("days_since_last_checkin")
@@ -14,6 +14,9 @@ from backend.database.supabase_client import get_supabase_client
 
 logger = logging.getLogger(__name__)
 
+# Fewest messages any message-based analyzer can work with
+MIN_MESSAGES_FOR_PATTERNS = 5
+
 class PatternType(Enum):
     USAGE_PATTERN = "usage_pattern"
     RESPONSE_PATTERN = "response_pattern"
@@ -50,16 +53,24 @@ class PatternRecognitionService:
         try:
             patterns = []
             
+            # Cheap COUNT before pulling message rows - new users rarely have
+            # enough messages for any analyzer to say something
+            message_count = self._count_recent_messages(user_id, days_back)
+            messages: List[Dict[str, Any]] = []
+            if message_count is None or message_count >= MIN_MESSAGES_FOR_PATTERNS:
+                # One fetch shared by every message-based analyzer
+                messages = self._fetch_recent_messages(user_id, days_back)
+            
             # Analyze different pattern types
-            usage_pattern = await self._analyze_usage_pattern(user_id, days_back)
+            usage_pattern = self._analyze_usage_pattern(messages, days_back)
             if usage_pattern:
                 patterns.append(usage_pattern)
             
-            response_pattern = await self._analyze_response_pattern(user_id, days_back)
+            response_pattern = self._analyze_response_pattern(messages)
             if response_pattern:
                 patterns.append(response_pattern)
             
-            time_pattern = await self._analyze_time_pattern(user_id, days_back)
+            time_pattern = self._analyze_time_pattern(messages)
             if time_pattern:
                 patterns.append(time_pattern)
             
@@ -67,7 +78,7 @@ class PatternRecognitionService:
             if streak_pattern:
                 patterns.append(streak_pattern)
             
-            engagement_pattern = await self._analyze_engagement_pattern(user_id, days_back)
+            engagement_pattern = self._analyze_engagement_pattern(messages)
             if engagement_pattern:
                 patterns.append(engagement_pattern)
             
@@ -78,23 +89,48 @@ class PatternRecognitionService:
             logger.error(f"Error analyzing patterns for {user_id}: {e}")
             return []
     
-    async def _analyze_usage_pattern(self, user_id: str, days_back: int) -> Optional[DetectedPattern]:
-        """Analyze usage patterns (when user opens app, frequency, etc.)"""
+    def _count_recent_messages(self, user_id: str, days_back: int) -> Optional[int]:
+        """Count messages in the window without transferring any rows (None if unknown)"""
         try:
             cutoff_date = (datetime.now() - timedelta(days=days_back)).isoformat()
             
-            # Get chat messages to analyze usage
-            messages_response = self.supabase.table('messages').select('*').eq(
-                'user_id', user_id
-            ).gte('created_at', cutoff_date).order('created_at', desc=True).execute()
+            count_response = self.supabase.table('messages').select(
+                'id', count='exact', head=True
+            ).eq('user_id', user_id).gte('created_at', cutoff_date).execute()
             
-            if not messages_response.data or len(messages_response.data) < 5:
-                return None  # Not enough data
+            return count_response.count
             
-            messages = messages_response.data
+        except Exception as e:
+            logger.warning(f"Error counting messages for {user_id}: {e}")
+            return None
+    
+    def _fetch_recent_messages(self, user_id: str, days_back: int) -> List[Dict[str, Any]]:
+        """Fetch the window's messages once, oldest first, with created_at parsed to datetime"""
+        try:
+            cutoff_date = (datetime.now() - timedelta(days=days_back)).isoformat()
+            
+            messages_response = self.supabase.table('messages').select(
+                'created_at, direction, content'
+            ).eq('user_id', user_id).gte('created_at', cutoff_date).order('created_at').execute()
+            
+            messages = messages_response.data or []
+            # Parse timestamps once here rather than again in every analyzer
+            for msg in messages:
+                msg['created_at'] = datetime.fromisoformat(msg['created_at'])
+            return messages
+            
+        except Exception as e:
+            logger.error(f"Error fetching messages for {user_id}: {e}")
+            return []
+    
+    def _analyze_usage_pattern(self, messages: List[Dict[str, Any]], days_back: int) -> Optional[DetectedPattern]:
+        """Analyze usage patterns (when user opens app, frequency, etc.)"""
+        try:
+            if len(messages) < 5:
+                return None  # Not enough data
             
             # Analyze usage frequency
-            usage_dates = [datetime.fromisoformat(msg['created_at']).date() for msg in messages]
+            usage_dates = [msg['created_at'].date() for msg in messages]
             unique_days = len(set(usage_dates))
             usage_rate = unique_days / days_back
             
@@ -122,7 +158,7 @@ class PatternRecognitionService:
                 confidence = 0.6
             
             # Pattern 2: Time clustering
-            usage_hours = [datetime.fromisoformat(msg['created_at']).hour for msg in messages]
+            usage_hours = [msg['created_at'].hour for msg in messages]
             hour_counts = {}
             for hour in usage_hours:
                 hour_counts[hour] = hour_counts.get(hour, 0) + 1
@@ -154,28 +190,20 @@ class PatternRecognitionService:
             logger.error(f"Error analyzing usage pattern: {e}")
             return None
     
-    async def _analyze_response_pattern(self, user_id: str, days_back: int) -> Optional[DetectedPattern]:
+    def _analyze_response_pattern(self, messages: List[Dict[str, Any]]) -> Optional[DetectedPattern]:
         """Analyze response patterns (how quickly user responds to coach)"""
         try:
-            cutoff_date = (datetime.now() - timedelta(days=days_back)).isoformat()
-            
-            # Get messages to analyze response timing
-            messages_response = self.supabase.table('messages').select('*').eq(
-                'user_id', user_id
-            ).gte('created_at', cutoff_date).order('created_at', asc=True).execute()
-            
-            if not messages_response.data or len(messages_response.data) < 10:
+            # Messages arrive oldest first, which the response matching relies on
+            if len(messages) < 10:
                 return None
             
-            messages = messages_response.data
-            
             # Calculate response times
             response_times = []
             coach_messages = [msg for msg in messages if msg['direction'] == 'outgoing']
             
             for i, coach_msg in enumerate(coach_messages):
                 # Find next user message after this coach message
-                coach_time = datetime.fromisoformat(coach_msg['created_at'])
+                coach_time = coach_msg['created_at']
                 next_user_msg = None
                 
                 # Look for user message after this coach message
@@ -185,7 +213,7 @@ class PatternRecognitionService:
                         break
                 
                 if next_user_msg:
-                    user_time = datetime.fromisoformat(next_user_msg['created_at'])
+                    user_time = next_user_msg['created_at']
                     response_time_hours = (user_time - coach_time).total_seconds() / 3600
                     if 0 < response_time_hours < 168:  # Less than a week
                         response_times.append(response_time_hours)
@@ -243,24 +271,16 @@ class PatternRecognitionService:
             logger.error(f"Error analyzing response pattern: {e}")
             return None
     
-    async def _analyze_time_pattern(self, user_id: str, days_back: int) -> Optional[DetectedPattern]:
+    def _analyze_time_pattern(self, messages: List[Dict[str, Any]]) -> Optional[DetectedPattern]:
         """Analyze time-based patterns (preferred times, day of week, etc.)"""
         try:
-            cutoff_date = (datetime.now() - timedelta(days=days_back)).isoformat()
-            
-            messages_response = self.supabase.table('messages').select('*').eq(
-                'user_id', user_id
-            ).gte('created_at', cutoff_date).execute()
-            
-            if not messages_response.data or len(messages_response.data) < 10:
+            if len(messages) < 10:
                 return None
             
-            messages = messages_response.data
-            
             # Analyze day of week patterns
             days_of_week = {}
             for msg in messages:
-                day_name = datetime.fromisoformat(msg['created_at']).strftime('%A')
+                day_name = msg['created_at'].strftime('%A')
                 days_of_week[day_name] = days_of_week.get(day_name, 0) + 1
             
             if len(days_of_week) < 3:
@@ -374,19 +394,12 @@ class PatternRecognitionService:
             logger.error(f"Error analyzing streak pattern: {e}")
             return None
     
-    async def _analyze_engagement_pattern(self, user_id: str, days_back: int) -> Optional[DetectedPattern]:
+    def _analyze_engagement_pattern(self, messages: List[Dict[str, Any]]) -> Optional[DetectedPattern]:
         """Analyze engagement patterns (message frequency, depth, etc.)"""
         try:
-            cutoff_date = (datetime.now() - timedelta(days=days_back)).isoformat()
-            
-            messages_response = self.supabase.table('messages').select('*').eq(
-                'user_id', user_id
-            ).gte('created_at', cutoff_date).execute()
-            
-            if not messages_response.data or len(messages_response.data) < 10:
+            if len(messages) < 10:
                 return None
             
-            messages = messages_response.data
             user_messages = [msg for msg in messages if msg['direction'] == 'incoming']
             
             if len(user_messages) < 5:
@@ -418,7 +431,7 @@ class PatternRecognitionService:
                 confidence = 0.5
             
             # Analyze message frequency
-            days_with_messages = len(set(datetime.fromisoformat(msg['created_at']).date() 
+            days_with_messages = len(set(msg['created_at'].date() 
                                         for msg in user_messages))
             message_frequency = len(user_messages) / days_with_messages if days_with_messages > 0 else 0
             
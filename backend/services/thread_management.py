@@ -17,6 +17,7 @@ import uuid
 MAX_RUN_TIMEOUT_SECONDS = 120
 
 from backend.database.supabase_client import get_supabase_client
+from backend.services.context_service import context_service
 
 logger = logging.getLogger(__name__)
 
@@ -597,6 +598,7 @@ class ThreadManagementService:
 
             if response.data and len(response.data) > 0:
                 created = response.data[0]
+                context_service.invalidate(user_id)
                 logger.info(f"Created coach task '{title}' for user {user_id}")
                 return {
                     "success": True,
@@ -0,0 +1,158 @@
+"""
+Tests for the context service
+Verifies context caching, invalidation and batched snapshot fetches
+"""
+
+import asyncio
+import time
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from tests.conftest import MockSupabaseResponse
+
+
+def _snapshot(name, current_streak=2, longest_streak=4):
+    return {
+        "name": name,
+        "current_streak": current_streak,
+        "longest_streak": longest_streak,
+        "pending_todos": [{"title": "Walk", "priority": "high", "created_by": "coach"}],
+    }
+
+
+@pytest.fixture
+def service(mock_supabase):
+    """A fresh ContextService whose batched snapshot RPC is mocked."""
+    from backend.services.context_service import ContextService
+
+    mock_supabase.rpc = MagicMock()
+    mock_supabase.snapshots = {}
+    mock_supabase.rpc.return_value.execute.side_effect = lambda: MockSupabaseResponse(
+        dict(mock_supabase.snapshots)
+    )
+    with patch("backend.services.context_service.get_supabase_client", return_value=mock_supabase):
+        yield ContextService()
+
+
+class TestContextService:
+    """Test suite for context caching and batching."""
+
+    @pytest.mark.asyncio
+    async def test_cache_hit_skips_fetch(self, service, mock_supabase, mock_user_id):
+        """
+        A second call within the TTL is served from the cache.
+        """
+        mock_supabase.snapshots[mock_user_id] = _snapshot("Ada")
+
+        first = await service.get_essential_context(mock_user_id)
+        second = await service.get_essential_context(mock_user_id)
+
+        assert first.user_name == "Ada"
+        assert second is first
+        assert mock_supabase.rpc.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_fetch(self, service, mock_supabase, mock_user_id):
+        """
+        Concurrent callers join the same in-flight fetch.
+        """
+        mock_supabase.snapshots[mock_user_id] = _snapshot("Ada")
+
+        first, second = await asyncio.gather(
+            service.get_essential_context(mock_user_id),
+            service.get_essential_context(mock_user_id),
+        )
+
+        assert first is second
+        assert mock_supabase.rpc.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_served_while_refreshing(self, service, mock_supabase, mock_user_id):
+        """
+        Entries past half the TTL are returned immediately and refreshed in the background.
+        """
+        from backend.services.context_service import CONTEXT_CACHE_TTL_SECONDS
+
+        mock_supabase.snapshots[mock_user_id] = _snapshot("Ada")
+        stale = await service.get_essential_context(mock_user_id)
+        key = (mock_user_id, "minimal")
+        service._cache[key] = (time.monotonic() - CONTEXT_CACHE_TTL_SECONDS * 0.75, stale)
+        mock_supabase.snapshots[mock_user_id] = _snapshot("Grace")
+
+        served = await service.get_essential_context(mock_user_id)
+        assert served is stale
+
+        await service._inflight[key]
+        assert service._cache[key][1].user_name == "Grace"
+
+    @pytest.mark.asyncio
+    async def test_invalidate_during_fetch_skips_cache(self, service, mock_user_id):
+        """
+        A fetch that overlaps an invalidate returns its result but doesn't cache it.
+        """
+        from backend.services.context_service import EssentialContext
+
+        release = asyncio.Event()
+
+        async def slow_fetch(user_id, context_type):
+            await release.wait()
+            return EssentialContext("Ada", 1, 1, [], user_id, context_type)
+
+        with patch.object(service, "_fetch_essential_context", side_effect=slow_fetch):
+            task = asyncio.create_task(service.get_essential_context(mock_user_id))
+            await asyncio.sleep(0)
+            service.invalidate(mock_user_id)
+            assert service._inflight == {}
+
+            release.set()
+            context = await task
+
+        assert context.user_name == "Ada"
+        assert service._cache.get((mock_user_id, "minimal")) is None
+
+    @pytest.mark.asyncio
+    async def test_fallback_context_not_cached(self, service, mock_user_id):
+        """
+        Default contexts built after an error are not cached.
+        """
+        with patch.object(service, "_get_minimal_context", side_effect=Exception("boom")):
+            context = await service.get_essential_context(mock_user_id)
+
+        assert context.context_type == "fallback"
+        assert service._cache.get((mock_user_id, "minimal")) is None
+
+    @pytest.mark.asyncio
+    async def test_rpc_failure_falls_back_to_per_field_reads(self, service, mock_supabase, mock_user_id):
+        """
+        When the batched RPC fails, name, streaks and todos are read table by table.
+        """
+        mock_supabase.rpc.return_value.execute.side_effect = Exception("function does not exist")
+        mock_supabase.set_table_data("users", [{"name": "Ada"}])
+        mock_supabase.set_table_data("user_streaks", [{"current_streak": 3, "longest_streak": 5}])
+        mock_supabase.set_table_data("shared_todos", [{"title": "Stretch", "priority": "low"}])
+
+        context = await service.get_essential_context(mock_user_id, "initialization")
+
+        assert context.user_name == "Ada"
+        assert (context.current_streak, context.longest_streak) == (3, 5)
+        assert [t.title for t in context.pending_todos] == ["Stretch"]
+        assert context.context_type == "initialization"
+
+    @pytest.mark.asyncio
+    async def test_snapshot_requests_batched(self, service, mock_supabase):
+        """
+        Snapshot requests from the same loop tick share RPCs of at most CONTEXT_BATCH_MAX_SIZE users.
+        """
+        from backend.services.context_service import CONTEXT_BATCH_MAX_SIZE
+
+        user_ids = [f"user-{i}" for i in range(CONTEXT_BATCH_MAX_SIZE + 50)]
+        for user_id in user_ids:
+            mock_supabase.snapshots[user_id] = _snapshot(user_id)
+
+        contexts = await asyncio.gather(*(service.get_essential_context(u) for u in user_ids))
+
+        assert [c.user_name for c in contexts] == user_ids
+        assert mock_supabase.rpc.call_count == 2
+        batch_sizes = sorted(len(c.args[1]["p_user_ids"]) for c in mock_supabase.rpc.call_args_list)
+        assert batch_sizes == [50, CONTEXT_BATCH_MAX_SIZE]
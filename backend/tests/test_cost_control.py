@@ -0,0 +1,122 @@
+"""
+Tests for cost control
+Verifies buffered AI call recording and pending usage accounting
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+
+@pytest.fixture
+def cost_control(mock_supabase):
+    """cost_control with a mocked client, no real flush timers and empty buffers."""
+    from backend.services import cost_control as cc
+
+    def reset():
+        cc._pending_calls = []
+        cc._pending_usage.clear()
+        cc._flush_timer = None
+        cc._limits_cache.clear()
+
+    mock_supabase.rpc = MagicMock()
+    reset()
+    with patch.object(cc, "get_supabase_client", return_value=mock_supabase), \
+            patch.object(cc, "threading"):
+        yield cc
+    reset()
+
+
+class TestCostControl:
+    """Test suite for buffered AI call recording."""
+
+    def test_record_adds_pending_usage(self, cost_control, mock_user_id):
+        """
+        Only successful, uncached calls count towards pending usage.
+        """
+        cost_control.record_ai_call(mock_user_id, "message_generation", tokens_generated=50)
+        cost_control.record_ai_call(mock_user_id, "message_generation", tokens_generated=40, cached=True)
+        cost_control.record_ai_call(mock_user_id, "message_generation", tokens_generated=30, success=False)
+
+        assert cost_control.get_pending_usage(mock_user_id) == {"calls": 1, "tokens": 50}
+        assert len(cost_control._pending_calls) == 3
+        cost_control.threading.Timer.assert_called_once()
+
+    def test_flush_releases_usage_after_success(self, cost_control, mock_supabase, mock_user_id):
+        """
+        A written batch no longer counts as pending.
+        """
+        cost_control.record_ai_call(mock_user_id, "message_generation", tokens_generated=50)
+
+        cost_control.flush_pending_ai_calls()
+
+        mock_supabase.rpc.assert_called_once()
+        assert mock_supabase.rpc.call_args[0][0] == "record_ai_calls"
+        assert cost_control.get_pending_usage(mock_user_id) == {"calls": 0, "tokens": 0}
+        assert cost_control._pending_calls == []
+
+    def test_flush_failure_keeps_usage_and_requeues(self, cost_control, mock_supabase, mock_user_id):
+        """
+        A failed batch stays buffered and keeps counting against the user's limits.
+        """
+        cost_control.record_ai_call(mock_user_id, "message_generation", tokens_generated=50)
+        cost_control._flush_timer = None
+        cost_control.threading.Timer.reset_mock()
+        mock_supabase.rpc.return_value.execute.side_effect = Exception("connection reset")
+
+        cost_control.flush_pending_ai_calls()
+
+        assert cost_control.get_pending_usage(mock_user_id) == {"calls": 1, "tokens": 50}
+        assert len(cost_control._pending_calls) == 1
+        cost_control.threading.Timer.assert_called_once()
+
+    def test_threshold_flush_releases_only_its_calls(self, cost_control, mock_user_id):
+        """
+        Calls buffered after a flush took its batch stay pending.
+        """
+        cost_control.record_ai_call(mock_user_id, "message_generation", tokens_generated=50)
+        taken = cost_control._pending_calls
+        cost_control._pending_calls = []
+        cost_control.record_ai_call(mock_user_id, "message_generation", tokens_generated=20)
+
+        cost_control._release_pending_usage(taken)
+
+        assert cost_control.get_pending_usage(mock_user_id) == {"calls": 1, "tokens": 20}
+
+    def test_buffer_cap_drops_calls(self, cost_control, mock_user_id):
+        """
+        Calls beyond AI_CALL_BUFFER_MAX_SIZE are dropped and not counted.
+        """
+        with patch.object(cost_control, "AI_CALL_BUFFER_MAX_SIZE", 2):
+            for _ in range(3):
+                cost_control.record_ai_call(mock_user_id, "message_generation", tokens_generated=10)
+
+        assert len(cost_control._pending_calls) == 2
+        assert cost_control.get_pending_usage(mock_user_id) == {"calls": 2, "tokens": 20}
+
+    def test_max_tokens_checked_before_database(self, cost_control, mock_user_id):
+        """
+        Oversized requests are rejected without reading the user's limits.
+        """
+        allowed, reason = cost_control.check_ai_call_allowed(
+            mock_user_id, estimated_tokens=cost_control.MAX_TOKENS_PER_CALL + 1
+        )
+
+        assert allowed is False
+        assert "exceeds maximum per call" in reason
+        cost_control.get_supabase_client.assert_not_called()
+
+    def test_pending_usage_counts_against_limits(self, cost_control, mock_supabase, mock_user_id):
+        """
+        Unflushed calls are added to the stored counters when checking limits.
+        """
+        mock_supabase.rpc.return_value.execute.return_value = MagicMock(data={
+            "daily_ai_calls_used": 99,
+            "daily_ai_calls_limit": 100,
+        })
+        assert cost_control.check_ai_call_allowed(mock_user_id)[0] is True
+
+        cost_control.record_ai_call(mock_user_id, "message_generation", tokens_generated=10)
+        allowed, reason = cost_control.check_ai_call_allowed(mock_user_id)
+
+        assert allowed is False
+        assert "Daily AI call limit" in reason
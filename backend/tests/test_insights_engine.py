@@ -99,3 +99,30 @@ class TestHealthInsightsEngine:
 
         for insight_type in expected_types:
             assert hasattr(InsightType, insight_type)
+
+    def test_last_7_days_chart_ends_today(self):
+        """
+        Chart series should cover the 7 days ending today, oldest first,
+        and highlight the requested day.
+        """
+        from datetime import date
+        from backend.services.health_insights_engine import health_insights_engine
+
+        today = date.today()
+        rows = [
+            {"date": today.isoformat(), "steps": 4200},
+            {"date": (today - timedelta(days=6)).isoformat(), "steps": 1000},
+        ]
+
+        labels, values, highlight_index = health_insights_engine._last_7_days_chart(rows, "steps")
+
+        assert labels[-1] == today.strftime("%a")
+        assert len(labels) == 7
+        assert values == [1000, 0, 0, 0, 0, 0, 4200]
+        assert highlight_index is None
+
+        _, _, max_index = health_insights_engine._last_7_days_chart(rows, "steps", highlight="max")
+        _, _, min_index = health_insights_engine._last_7_days_chart(rows, "steps", highlight="min")
+
+        assert max_index == 6
+        assert min_index == 0